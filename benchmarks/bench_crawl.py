@@ -0,0 +1,122 @@
+'''Measure time-to-DataReady of the catalog crawl against a local stand-in.
+
+A threaded HTTP server on the loopback interface serves station pages
+linking to PLS playlists, adding a fixed latency to every response.
+Every station uses its own loopback address (127.0.0.N), so the
+per-host limit of the worker pool applies as it does for real
+directories. The crawl follows the same two phases as the service:
+station pages first, then every linked playlist.
+
+Run from the source tree: python -m benchmarks.bench_crawl [STATIONS] [CHANNELS]
+'''
+
+from BaseHTTPServer    import BaseHTTPRequestHandler, HTTPServer
+from SocketServer      import ThreadingMixIn
+from threading         import Lock, Thread
+from webradio.playlist import parse as parse_playlist
+from webradio.pool     import WorkerPool
+from webradio.scraper  import create_scraper
+
+import sys
+import time
+import urllib2
+
+LATENCY = 0.05
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    channel_count = 10
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+
+        if self.path.endswith('.pls'):
+            body = ('[playlist]\nNumberOfEntries=1\n'
+                    'File1=http://%s/stream\nTitle1=%s\n'
+                    % (self.headers['host'], self.path))
+        else:
+            body = ''.join(['<a href="/channel%d.pls">%d</a>\n' % (i, i)
+                            for i in range(self.server.channel_count)])
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def fetch(uri):
+    response = urllib2.urlopen(uri)
+
+    try:
+        response.status = response.getcode()
+        return response, response.read()
+
+    finally:
+        response.close()
+
+def crawl(station_uris, concurrency, host_limit):
+    pool = WorkerPool(concurrency, host_limit)
+    scraper = create_scraper()
+    lock = Lock()
+    playlists = []
+    streams = []
+
+    def load_station(uri):
+        links = scraper.scrape(uri, fetch) or []
+
+        lock.acquire()
+        playlists.extend(links)
+        lock.release()
+
+    def load_channel(uri):
+        response, content = fetch(uri)
+        result = list(parse_playlist(content, uri))
+
+        lock.acquire()
+        streams.extend(result)
+        lock.release()
+
+    start = time.time()
+
+    for uri in station_uris:
+        pool.submit(uri, load_station)
+
+    pool.join()
+    stations_ready = time.time() - start
+
+    for uri in playlists:
+        pool.submit(uri, load_channel)
+
+    pool.join()
+    channels_ready = time.time() - start
+
+    return stations_ready, channels_ready, len(streams)
+
+def main(args):
+    station_count = len(args) > 1 and int(args[1]) or 8
+    channel_count = len(args) > 2 and int(args[2]) or 10
+    station_uris = []
+
+    for i in range(station_count):
+        server = StandInServer(('127.0.0.%d' % (i + 1), 0), StandInHandler)
+        server.channel_count = channel_count
+
+        worker = Thread(target=server.serve_forever)
+        worker.setDaemon(True)
+        worker.start()
+
+        station_uris.append('http://%s:%d/' % server.server_address)
+
+    for concurrency, host_limit in (1, 1), (8, 2), (16, 4):
+        stations_ready, channels_ready, count = \
+            crawl(station_uris, concurrency, host_limit)
+
+        print ('concurrency=%-2d host-limit=%d: DataReady(1) after %.2fs, '
+               'DataReady(2) after %.2fs (%d streams)' %
+               (concurrency, host_limit, stations_ready, channels_ready, count))
+
+if '__main__' == __name__:
+    main(sys.argv)
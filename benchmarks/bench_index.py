@@ -0,0 +1,47 @@
+'''Compare ChannelIndex.find() with a linear Channel.matches() scan.
+
+Run from the source tree: python -m benchmarks.bench_index [CHANNELS]
+'''
+
+from tests.test_index import make_catalog, make_queries
+from webradio.index   import ChannelIndex
+
+import sys
+import time
+
+def main(args):
+    channel_count = len(args) > 1 and int(args[1]) or 100000
+
+    start = time.time()
+    stations = make_catalog(channel_count)
+    channels = [c for s in stations for c in s.channels]
+    queries = make_queries(stations, 200)
+    print 'generated %d channels in %.2fs' % (len(channels), time.time() - start)
+
+    start = time.time()
+    index = ChannelIndex()
+
+    for station in stations:
+        index.add_station(station)
+
+    print 'built index in %.2fs' % (time.time() - start)
+
+    start = time.time()
+
+    for query in queries:
+        [c for c in channels if c.matches(query)]
+
+    linear = (time.time() - start) / len(queries)
+
+    start = time.time()
+
+    for query in queries:
+        index.find(query)
+
+    indexed = (time.time() - start) / len(queries)
+
+    print 'linear scan: %.2f ms/query' % (linear * 1000)
+    print 'index find:  %.2f ms/query' % (indexed * 1000)
+
+if '__main__' == __name__:
+    main(sys.argv)
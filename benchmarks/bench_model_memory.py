@@ -0,0 +1,115 @@
+'''Compare bytes per channel of the slotted model with the former classes.
+
+The legacy classes below are trimmed copies of the model as it was
+before the compact representation: plain objects with a per-instance
+__dict__, list tags recomputed from every channel URI and one alias
+dict per station.
+
+Run from the source tree: python -m benchmarks.bench_model_memory [CHANNELS]
+'''
+
+from webradio import model
+
+import sys
+import urlparse
+
+class LegacyStream(object):
+    def __init__(self, uri, title, length):
+        self.__uri    = uri
+        self.__title  = title
+        self.__length = length
+
+class LegacyChannel(object):
+    def __init__(self, station, uri, tags=None, streams=None):
+        self.__station = station
+        self.__uri     = uri
+        self.__tags    = tags
+        self.__streams = streams
+
+        aliases = station.aliases
+
+        if self.__tags is None:
+            path = urlparse.urlparse(uri)[2].split('/')
+            self.__tags = [aliases.get(t, t) for t in
+                           path[1:-1] + path[-1].split('.')[:-1]]
+        if self.__streams is None:
+            self.__streams = []
+
+class LegacyStation(object):
+    def __init__(self, id, title, uri):
+        self.__id         = id
+        self.__title      = title
+        self.__uri        = uri
+        self.__stream_uri = None
+        self.__channels   = []
+        self.__aliases    = dict()
+
+    uri      = property(fget=lambda self: self.__uri)
+    aliases  = property(fget=lambda self: self.__aliases)
+    channels = property(fget=lambda self: self.__channels)
+
+GENRES = ['trance', 'house', 'lounge', 'jazz', 'rock', 'chillout', 'techno']
+
+def build_catalog(Station, Channel, Stream, channel_count):
+    stations = [Station('station%d' % i, 'Station %d' % i,
+                        'http://station%d.example/' % i) for i in range(20)]
+
+    for i in range(channel_count):
+        station = stations[i % len(stations)]
+        genre = GENRES[i % len(GENRES)]
+        uri = '%spublic%d/%s%d.pls' % (station.uri, i % 3, genre, i)
+        streams = [Stream('http://mirror%d.example:8000/%s%d' % (j, genre, i),
+                          '%s %d (mirror %d)' % (genre.title(), i, j), -1)
+                   for j in range(3)]
+        station.channels.append(Channel(station, uri, None, streams))
+
+    return stations
+
+def get_slots(obj):
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_%s%s' % (cls.__name__.lstrip('_'), name)
+
+            yield getattr(obj, name, None)
+
+def deep_size(root):
+    seen = set()
+    pending = [root]
+    total = 0
+
+    while pending:
+        obj = pending.pop()
+
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            pending.extend(obj)
+        elif not isinstance(obj, basestring):
+            if hasattr(obj, '__dict__'):
+                pending.append(obj.__dict__)
+
+            pending.extend(get_slots(obj))
+
+    return total
+
+def main(args):
+    channel_count = len(args) > 1 and int(args[1]) or 10000
+
+    legacy = build_catalog(LegacyStation, LegacyChannel, LegacyStream,
+                           channel_count)
+    compact = build_catalog(model.Station, model.Channel, model.Stream,
+                            channel_count)
+
+    print 'before: %d bytes per channel' % (deep_size(legacy) / channel_count)
+    print 'after:  %d bytes per channel' % (deep_size(compact) / channel_count)
+
+if '__main__' == __name__:
+    main(sys.argv)
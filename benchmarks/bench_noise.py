@@ -0,0 +1,95 @@
+'''Compare Station.filter_noise with the former sequential re.sub path.
+
+Run from the source tree: python -m benchmarks.bench_noise [ROUNDS]
+'''
+
+from webradio.model import Station
+
+import re
+import sys
+import time
+
+NOISE_FILTERS = [
+    r'D I G I T A L L Y - I M P O R T E D',
+    r'\& HappyHardcore\.com',
+    r'!+$',
+]
+
+GENRES = [
+    'Vocal Trance', 'Progressive', 'Chillout', 'Lounge', 'Goa-Psy Trance',
+    'Hard Dance', 'Eurodance', 'Drum \'n Bass', 'Classic Techno', 'Ambient',
+]
+
+class LegacyStation(object):
+    def __init__(self, id, title, uri):
+        self.__noise_filters = [
+            re.compile(re.escape(title)),
+            re.compile(r'(^\s*-\s*|\s*-\s*$)')
+        ]
+
+    def add_noise_filter(self, pattern):
+        self.__noise_filters.insert(-2, re.compile(pattern))
+
+    def filter_noise(self, text):
+        for f in self.__noise_filters:
+            text = f.subn('', text)[0].strip()
+
+        return text
+
+def make_titles(count):
+    titles = []
+
+    for i in range(count):
+        genre = GENRES[i % len(GENRES)]
+
+        if i % 3 == 0:
+            title = 'D I G I T A L L Y - I M P O R T E D - %s %d' % (genre, i)
+        elif i % 3 == 1:
+            title = 'Digitally Imported - %s %d!!' % (genre, i)
+        else:
+            title = '%s %d - Happy Hardcore & HappyHardcore.com' % (genre, i)
+
+        titles.append(title)
+
+    return titles
+
+def make_station(cls):
+    station = cls('di', 'Digitally Imported', 'http://www.di.fm/')
+
+    for pattern in NOISE_FILTERS:
+        station.add_noise_filter(pattern)
+
+    return station
+
+def measure(cls, titles, rounds, fresh):
+    station = make_station(cls)
+    start = time.time()
+
+    for i in range(rounds):
+        # a fresh station per round defeats the filter cache,
+        # as happens for titles seen for the first time
+        if fresh:
+            station = make_station(cls)
+
+        for title in titles:
+            station.filter_noise(title)
+
+    return (time.time() - start) / (rounds * len(titles))
+
+def main(args):
+    rounds = len(args) > 1 and int(args[1]) or 200
+    titles = make_titles(500)
+
+    for label, fresh in (('first seen', True), ('repeated', False)):
+        # best of five, the first seen case is sensitive to noise
+        old = min([measure(LegacyStation, titles, rounds, fresh)
+                   for i in range(5)])
+        new = min([measure(Station, titles, rounds, fresh)
+                   for i in range(5)])
+
+        print '%s titles:' % label
+        print '  re.sub:       %.2f us/title' % (old * 1e6)
+        print '  filter_noise: %.2f us/title' % (new * 1e6)
+
+if '__main__' == __name__:
+    main(sys.argv)
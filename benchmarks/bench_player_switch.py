@@ -0,0 +1,113 @@
+'''Measure switch-to-audio latency of the Player.
+
+Generates a few WAV files from audiotestsrc, then switches between them
+by tearing the pipeline down to NULL (the former behaviour) and with
+Player.switch_uri(), which keeps the sink chain alive. The latency is
+the time from the switch until the first buffer reaches the audio
+converter. Needs GStreamer 0.10 and an audio output; run it by hand:
+
+    python -m benchmarks.bench_player_switch [ROUNDS]
+'''
+
+from webradio.player import Player
+
+import gobject
+import glib
+import gst
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+def make_test_files(dirname, count=3):
+    uris = []
+
+    for i in range(count):
+        filename = os.path.join(dirname, 'tone%d.wav' % i)
+        pipeline = gst.parse_launch(
+            'audiotestsrc num-buffers=400 freq=%d volume=0.1 ! '
+            'audioconvert ! wavenc ! filesink location="%s"'
+            % (220 * (i + 1), filename))
+
+        pipeline.set_state(gst.STATE_PLAYING)
+        pipeline.get_bus().timed_pop_filtered(
+            gst.CLOCK_TIME_NONE, gst.MESSAGE_EOS | gst.MESSAGE_ERROR)
+        pipeline.set_state(gst.STATE_NULL)
+
+        uris.append('file://' + filename)
+
+    return uris
+
+def restart_uri(player, uri):
+    player.set_state(gst.STATE_NULL)
+    player.uri = uri
+    player.set_state(gst.STATE_PLAYING)
+
+def measure(player, switch, uris, rounds):
+    state = dict(started=None, latency=None)
+    loop = glib.MainLoop()
+
+    def buffer_probe_cb(pad, buffer):
+        if state['started'] is not None and state['latency'] is None:
+            state['latency'] = time.time() - state['started']
+            glib.idle_add(loop.quit)
+
+        return True
+
+    pad = player.get_by_name('converter').get_static_pad('sink')
+    probe_id = pad.add_buffer_probe(buffer_probe_cb)
+    latencies = []
+
+    try:
+        for i in range(rounds):
+            # let the previous channel play for a moment
+            glib.timeout_add(300, loop.quit)
+            loop.run()
+
+            state['started'], state['latency'] = time.time(), None
+            switch(player, uris[i % len(uris)])
+
+            timeout_id = glib.timeout_add(5000, loop.quit)
+            loop.run()
+            glib.source_remove(timeout_id)
+
+            if state['latency'] is not None:
+                latencies.append(state['latency'])
+
+    finally:
+        pad.remove_buffer_probe(probe_id)
+
+    return latencies
+
+def report(name, latencies, rounds):
+    if not latencies:
+        print '%-12s no audio within 5s' % name
+        return
+
+    average = sum(latencies) / len(latencies)
+    print '%-12s %.1f ms average, %.1f ms worst (%d/%d switches)' % (
+        name, average * 1000, max(latencies) * 1000, len(latencies), rounds)
+
+def main(args):
+    rounds = len(args) > 1 and int(args[1]) or 20
+    dirname = tempfile.mkdtemp(prefix='webradio-bench-')
+
+    gobject.threads_init()
+
+    try:
+        uris = make_test_files(dirname)
+        player = Player()
+        player.volume = 0.1
+        restart_uri(player, uris[0])
+
+        report('restart:', measure(player, restart_uri, uris, rounds), rounds)
+        report('switch_uri:', measure(player, Player.switch_uri, uris, rounds), rounds)
+
+        player.set_state(gst.STATE_NULL)
+
+    finally:
+        shutil.rmtree(dirname)
+
+if '__main__' == __name__:
+    main(sys.argv)
@@ -0,0 +1,61 @@
+'''Compare the playlist parser with the former ConfigParser based PLS path.
+
+Run from the source tree: python -m benchmarks.bench_playlist [ROUNDS]
+'''
+
+from ConfigParser      import SafeConfigParser
+from StringIO          import StringIO
+from webradio.model    import Stream
+from webradio.playlist import parse
+
+import sys
+import time
+
+def make_pls(count):
+    lines = ['[playlist]', 'NumberOfEntries=%d' % count]
+
+    for i in range(1, count + 1):
+        lines.append('File%d=http://stream%d.example:8000/listen' % (i, i))
+        lines.append('Title%d=(#%d - 1/%d) Example Radio - Channel' % (i, i, count))
+        lines.append('Length%d=-1' % i)
+
+    lines.append('Version=2')
+
+    return '\n'.join(lines) + '\n'
+
+def parse_configparser(content):
+    parser = SafeConfigParser()
+    parser.readfp(StringIO(content))
+
+    playlist = dict(parser.items('playlist'))
+    length = int(playlist['numberofentries'])
+
+    for i in range(1, length + 1):
+        uri = playlist['file%d' % i]
+        title = playlist.get('title%d' % i)
+        length = int(playlist.get('length%d' % i, -1))
+
+        yield Stream(uri, title, length)
+
+def measure(fun, contents, rounds):
+    start = time.time()
+
+    for i in range(rounds):
+        for content in contents:
+            list(fun(content))
+
+    return (time.time() - start) / (rounds * len(contents))
+
+def main(args):
+    rounds = len(args) > 1 and int(args[1]) or 2000
+    contents = [make_pls(n) for n in (1, 3, 8, 32)]
+
+    old = measure(parse_configparser, contents, rounds)
+    new = measure(lambda content: parse(content, 'http://example/x.pls'),
+                  contents, rounds)
+
+    print 'ConfigParser: %.1f us/playlist' % (old * 1e6)
+    print 'parser:       %.1f us/playlist' % (new * 1e6)
+
+if '__main__' == __name__:
+    main(sys.argv)
@@ -0,0 +1,45 @@
+from webradio.catalog import load_snapshot, save_snapshot
+from webradio.model   import Channel, Station, Stream
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class UTF8String(str):
+    """Stand-in for dbus.UTF8String, which is a plain str subclass."""
+
+class CatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, 'catalog')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_snapshot_keeps_utf8_strings(self):
+        title = UTF8String('Radio F\xc3\xbcnf')
+        uri = UTF8String('http://radio.example/f\xc3\xbcnf.pls')
+
+        station = Station(UTF8String('fuenf'), title, uri)
+        stream = Stream(uri, title, -1)
+        station.channels.append(Channel(station, uri, [title], [stream]))
+
+        save_snapshot(self.filename, [station], ('epoch', 1))
+        state, stations = load_snapshot(self.filename)
+
+        self.assertEqual(('epoch', 1), state)
+        self.assertEqual('Radio F\xc3\xbcnf', stations[0].title)
+        self.assertEqual([title], list(stations[0].channels[0].tags))
+        self.assertEqual(title, stations[0].channels[0].streams[0].title)
+
+    def test_snapshot_keeps_unicode(self):
+        station = Station('fuenf', u'Radio F\xfcnf', 'http://radio.example/')
+
+        save_snapshot(self.filename, [station])
+        state, stations = load_snapshot(self.filename)
+
+        self.assertEqual(u'Radio F\xfcnf', stations[0].title)
+
+if '__main__' == __name__:
+    unittest.main()
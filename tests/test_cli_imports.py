@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = 'cairo', 'gst', 'gtk', 'httplib2', 'pango', 'pangocairo'
+
+# Runs in a fresh interpreter: importing any of the heavy modules fails,
+# while the D-Bus and GLib bindings the CLI really needs are replaced by
+# empty stand-ins when they are not installed.
+SCRIPT = r'''
+import imp
+import sys
+
+heavy = set(sys.argv[1:])
+
+class Blocker(object):
+    def find_module(self, name, path=None):
+        if name.split('.')[0] in heavy:
+            return self
+
+    def load_module(self, name):
+        raise ImportError('%s must not be imported by the CLI' % name)
+
+sys.meta_path.insert(0, Blocker())
+
+def stub(name, **attrs):
+    try:
+        __import__(name)
+
+    except ImportError:
+        module = sys.modules[name] = imp.new_module(name)
+        module.__dict__.update(attrs)
+
+class GObject(object):
+    pass
+
+stub('dbus', Interface=object, SessionBus=object)
+stub('dbus.mainloop')
+stub('dbus.mainloop.glib', DBusGMainLoop=object)
+stub('glib', MainLoop=object, timeout_add=None, source_remove=None)
+stub('gobject', GObject=GObject, SIGNAL_RUN_LAST=0, TYPE_NONE=None)
+
+import webradio.cli
+
+loaded = sorted(heavy.intersection([n.split('.')[0] for n in sys.modules
+                                    if sys.modules[n] is not None]))
+
+if loaded:
+    raise SystemExit('heavy modules imported: %s' % ', '.join(loaded))
+'''
+
+class CommandLineImportTest(unittest.TestCase):
+    def test_cli_avoids_heavy_imports(self):
+        topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        command = [sys.executable, '-c', SCRIPT] + list(HEAVY_MODULES)
+        process = subprocess.Popen(command, cwd=topdir,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+
+        self.assertEqual(0, process.returncode, output)
+
+if '__main__' == __name__:
+    unittest.main()
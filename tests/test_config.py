@@ -0,0 +1,34 @@
+from webradio.config import Configuration
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class ConfigurationTest(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, 'settings')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_write_keeps_foreign_changes(self):
+        window, service = Configuration(), Configuration()
+
+        service.buffer_size = 65536
+        service.buffer_duration = 3000
+        service.write(self.filename)
+
+        window.tags = 'rock jazz'
+        window.write(self.filename)
+
+        config = Configuration()
+        config.read(self.filename)
+
+        self.assertEqual(65536, config.buffer_size)
+        self.assertEqual(3000, config.buffer_duration)
+        self.assertEqual('rock jazz', config.tags)
+
+if '__main__' == __name__:
+    unittest.main()
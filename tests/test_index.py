@@ -0,0 +1,88 @@
+from webradio.index import ChannelIndex
+from webradio.model import Channel, Station, Stream
+
+import random
+import unittest
+
+WORDS = ['rock', 'jazz', 'trance', 'lounge', 'chill', 'pop', 'hits', 'soul',
+         'metal', 'classic', 'vocal', 'smooth', 'deep', 'house', 'fm', 'x']
+
+def make_catalog(channel_count, seed=0):
+    rng = random.Random(seed)
+    stations = [Station('station%d' % i, 'Station %s %d' % (rng.choice(WORDS), i),
+                        'http://station%d.example/' % i) for i in range(20)]
+
+    for i in range(channel_count):
+        station = rng.choice(stations)
+        title = ' '.join([rng.choice(WORDS) for j in range(rng.randint(1, 3))])
+        tags = rng.sample(WORDS, rng.randint(1, 3))
+        uri = '%s%s/%d.pls' % (station.uri, tags[0], i)
+        streams = [Stream('http://stream.example/%d' % i, title, -1)]
+        station.channels.append(Channel(station, uri, tags, streams))
+
+    return stations
+
+def make_queries(stations, count, seed=1):
+    rng = random.Random(seed)
+    terms = WORDS + [s.id for s in stations] + ['ro', 'z', 'ance', 'Station']
+    return [rng.sample(terms, rng.randint(0, 3)) for i in range(count)]
+
+class ChannelIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.stations = make_catalog(1000)
+        self.index = ChannelIndex()
+
+        for station in self.stations:
+            self.index.add_station(station)
+
+    def channels(self):
+        return [c for s in self.stations for c in s.channels]
+
+    def assertMatchesLinearScan(self, query):
+        expected = set([c for c in self.channels() if c.matches(query)])
+        actual = self.index.find(query)
+
+        self.assertEqual(len(actual), len(set(actual)))
+        self.assertEqual(expected, set(actual), repr(query))
+
+    def test_find_matches_channel_matches(self):
+        for query in make_queries(self.stations, 500):
+            self.assertMatchesLinearScan(query)
+
+    def test_remove_channel(self):
+        for station in self.stations[:5]:
+            for channel in station.channels[::2]:
+                self.index.remove_channel(channel)
+                station.channels.remove(channel)
+
+                self.assertTrue(self.index.lookup(channel.uri) is None)
+
+        for query in make_queries(self.stations, 100):
+            self.assertMatchesLinearScan(query)
+
+    def test_compact(self):
+        self.index.compact_threshold = 100
+        removed = []
+
+        for station in self.stations[:15]:
+            for channel in list(station.channels):
+                self.index.remove_channel(channel)
+                station.channels.remove(channel)
+                removed.append(channel)
+
+        self.assertEqual(len(self.channels()), len(self.index.find([])))
+
+        for channel in removed:
+            self.assertTrue(self.index.lookup(channel.uri) is None)
+        for channel in self.channels():
+            self.assertTrue(self.index.lookup(channel.uri) is channel)
+        for query in make_queries(self.stations, 100):
+            self.assertMatchesLinearScan(query)
+
+    def test_lookup(self):
+        for channel in self.channels():
+            self.assertTrue(self.index.lookup(channel.uri) is channel)
+            self.assertTrue(self.index.lookup(channel.streams[0].uri) is channel)
+
+if '__main__' == __name__:
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from webradio.model import Station, compile_noise_filter
+
+import re
+import unittest
+
+PATTERNS = [
+    r'D I G I T A L L Y - I M P O R T E D',
+    r'\& HappyHardcore\.com',
+    r'!+$',
+    r'(^\s*-\s*|\s*-\s*$)',
+    re.escape('Radio F\xc3\xbcnf'),
+    re.escape(u'Radio F\xfcnf'),
+    re.escape('Sky.fm (+) Radio'),
+]
+
+TEXTS = [
+    '',
+    'D I G I T A L L Y - I M P O R T E D - Trance',
+    'Vocal Trance \\& HappyHardcore.com!!!',
+    ' - Chillout - ',
+    'Radio F\xc3\xbcnf - Hits',
+    u'Radio F\xfcnf - Hits',
+    u'Gr\xfc\xdfe aus D I G I T A L L Y - I M P O R T E D',
+    'Sky.fm (+) Radio - Smooth Jazz',
+]
+
+def reference_filter(pattern):
+    regex = re.compile(pattern)
+    return lambda text: regex.sub('', text).strip()
+
+class NoiseFilterTest(unittest.TestCase):
+    def test_matches_regex_filter(self):
+        for pattern in PATTERNS:
+            expected = reference_filter(pattern)
+            actual = compile_noise_filter(pattern)
+
+            for text in TEXTS:
+                self.assertEqual(expected(text), actual(text),
+                                 '%r on %r' % (pattern, text))
+
+    def test_mixed_string_types(self):
+        noise_filter = compile_noise_filter(re.escape('Radio F\xc3\xbcnf'))
+        self.assertEqual(u'Radio F\xfcnf - Hits',
+                         noise_filter(u'Radio F\xfcnf - Hits'))
+        self.assertEqual('- Hits', noise_filter('Radio F\xc3\xbcnf - Hits'))
+
+    def test_station_pipeline(self):
+        station = Station('di.fm', 'Digitally Imported', 'http://www.di.fm/')
+        station.add_noise_filter(PATTERNS[0])
+        station.add_noise_filter(PATTERNS[2])
+
+        pipeline = [reference_filter(p) for p in
+                    [PATTERNS[0], PATTERNS[2], re.escape(station.title),
+                     PATTERNS[3]]]
+
+        for text in TEXTS + ['Digitally Imported - Lounge!']:
+            expected = text
+
+            for f in pipeline:
+                expected = f(expected)
+
+            self.assertEqual(expected, station.filter_noise(text))
+
+if '__main__' == __name__:
+    unittest.main()
@@ -0,0 +1,63 @@
+from webradio.playlist import parse
+
+import unittest
+
+PLS = '''[playlist]
+NumberOfEntries=3
+File1=http://stream.example/one
+Title1=One
+Length1=-1
+File2=two
+Title2=Two
+File3=/three
+'''
+
+M3U = '''#EXTM3U
+#EXTINF:-1,One
+http://stream.example/one
+#EXTINF:10,Two
+two
+'''
+
+XSPF = '''<?xml version="1.0" encoding="UTF-8"?>
+<playlist version="1" xmlns="http://xspf.org/ns/0/">
+  <trackList>
+    <track><location>http://stream.example/one</location><title>One</title></track>
+    <track><location>two</location><duration>10000</duration></track>
+  </trackList>
+</playlist>
+'''
+
+class PlaylistTest(unittest.TestCase):
+    base_uri = 'http://radio.example/lists/rock.pls'
+
+    def test_pls(self):
+        streams = list(parse(PLS, self.base_uri))
+        self.assertEqual([('http://stream.example/one', 'One', -1),
+                          ('http://radio.example/lists/two', 'Two', -1),
+                          ('http://radio.example/three', '', -1)], streams)
+
+    def test_m3u(self):
+        streams = list(parse(M3U, 'http://radio.example/lists/rock.m3u'))
+        self.assertEqual([('http://stream.example/one', 'One', -1),
+                          ('http://radio.example/lists/two', 'Two', 10)], streams)
+
+    def test_xspf(self):
+        streams = list(parse(XSPF, 'http://radio.example/lists/rock.xspf'))
+        self.assertEqual([('http://stream.example/one', 'One', -1),
+                          ('http://radio.example/lists/two', '', 10)], streams)
+
+    def test_plain_m3u(self):
+        streams = list(parse('http://stream.example/one\n', 'x.m3u'))
+        self.assertEqual([('http://stream.example/one', '', -1)], streams)
+
+    def test_broken_entry_count(self):
+        content = PLS.replace('NumberOfEntries=3', 'NumberOfEntries=7')
+        self.assertEqual(3, len(list(parse(content))))
+
+    def test_title_filter(self):
+        streams = parse(PLS, title_filter=lambda title: title.upper())
+        self.assertEqual(['ONE', 'TWO', ''], [s.title for s in streams])
+
+if '__main__' == __name__:
+    unittest.main()
@@ -0,0 +1,59 @@
+from threading     import Lock
+from webradio.pool import WorkerPool
+
+import time
+import unittest
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.lock = Lock()
+        self.active = dict()
+        self.peak = dict()
+        self.done = []
+
+    def task(self, uri, host):
+        self.lock.acquire()
+        self.active[host] = self.active.get(host, 0) + 1
+        self.active[None] = self.active.get(None, 0) + 1
+
+        for key in host, None:
+            self.peak[key] = max(self.peak.get(key, 0), self.active[key])
+
+        self.lock.release()
+        time.sleep(0.01)
+        self.lock.acquire()
+
+        self.active[host] -= 1
+        self.active[None] -= 1
+        self.done.append(uri)
+
+        self.lock.release()
+
+    def test_limits(self):
+        pool = WorkerPool(concurrency=4, host_limit=2)
+        uris = ['http://host%d.example/%d' % (i % 3, i) for i in range(30)]
+
+        for uri in uris:
+            pool.submit(uri, self.task, uri.split('/')[2])
+
+        pool.join()
+
+        self.assertEqual(sorted(uris), sorted(self.done))
+        self.assertTrue(self.peak[None] <= 4)
+
+        for i in range(3):
+            self.assertTrue(self.peak['host%d.example' % i] <= 2)
+
+    def test_failing_task(self):
+        def fail(uri):
+            raise RuntimeError(uri)
+
+        pool = WorkerPool(concurrency=1, host_limit=1)
+        pool.submit('http://host.example/fail', fail)
+        pool.submit('http://host.example/ok', self.task, 'host.example')
+        pool.join()
+
+        self.assertEqual(['http://host.example/ok'], self.done)
+
+if '__main__' == __name__:
+    unittest.main()
@@ -0,0 +1,51 @@
+from StringIO         import StringIO
+from webradio.scraper import create_scraper
+
+import unittest
+
+PAGE = '''<html><body>
+<a href="one.pls">One</a>
+<a href="http://other.example/two.m3u">Two</a>
+</body></html>
+'''
+
+class Response(object):
+    def __init__(self, status):
+        self.status = status
+
+def fetch_page(uri):
+    return Response(200), PAGE
+
+class ScraperTest(unittest.TestCase):
+    def test_regex_resolves_relative_links(self):
+        links = create_scraper('regex').scrape('http://radio.example/list/', fetch_page)
+
+        self.assertEqual(['http://radio.example/list/one.pls',
+                          'http://other.example/two.m3u'], links)
+
+    def test_regex_rejects_patterns_without_single_group(self):
+        for pattern in (r'href="[^"]+"', r'(href)="([^"]+)"'):
+            self.assertRaises(ValueError, create_scraper,
+                              'regex', dict(pattern=pattern))
+
+    def test_failed_fetch_returns_none(self):
+        scraper = create_scraper('json')
+        self.assertEqual(None, scraper.scrape('http://radio.example/',
+                                              lambda uri: (Response(404), '')))
+
+    def test_html_reads_through_stream(self):
+        opened = []
+
+        def stream(uri):
+            opened.append(uri)
+            return StringIO(PAGE)
+
+        links = create_scraper('html').scrape('http://radio.example/',
+                                              fetch_page, stream)
+
+        self.assertEqual(['http://radio.example/'], opened)
+        self.assertEqual(['http://radio.example/one.pls',
+                          'http://other.example/two.m3u'], links)
+
+if '__main__' == __name__:
+    unittest.main()
@@ -0,0 +1,73 @@
+from webradio.model   import Channel, Station, Stream
+from webradio.storage import replace_file
+
+import marshal
+
+SNAPSHOT_VERSION = 3
+
+def _text(value):
+    if value is None or type(value) is str:
+        return value
+
+    # dbus.UTF8String and friends hold encoded bytes,
+    # which unicode() would try to decode as ASCII
+    if isinstance(value, str):
+        return str(value)
+
+    return unicode(value)
+
+def encode_stream(stream):
+    return _text(stream.uri), _text(stream.title), int(stream.length)
+
+def encode_channel(channel):
+    return (_text(channel.uri), [_text(t) for t in channel.tags],
+            [encode_stream(s) for s in channel.streams])
+
+def encode_station_config(station):
+    aliases = dict([(_text(k), _text(v)) for k, v in station.aliases.items()])
+    noise_filters = [_text(p) for p in station.noise_filters]
+    return _text(station.stream_uri), aliases, noise_filters
+
+def encode_stations(stations):
+    return [(_text(s.id), _text(s.title), _text(s.uri),
+             encode_station_config(s),
+             [encode_channel(c) for c in s.channels])
+            for s in stations]
+
+def decode_stations(data):
+    stations = list()
+
+    for id, title, uri, config, channels in data:
+        station = Station(id, title, uri)
+        stream_uri, aliases, noise_filters = config
+
+        if stream_uri:
+            station.stream_uri = stream_uri
+        for name, value in aliases.items():
+            station.add_alias(name, value)
+        for pattern in noise_filters:
+            station.add_noise_filter(pattern)
+
+        for uri, tags, streams in channels:
+            streams = [Stream(*s) for s in streams]
+            station.channels.append(Channel(station, uri, tags, streams))
+
+        stations.append(station)
+
+    return stations
+
+def save_snapshot(filename, stations, state=None):
+    data = SNAPSHOT_VERSION, state, encode_stations(stations)
+    replace_file(filename, marshal.dumps(data))
+
+def load_snapshot(filename):
+    try:
+        version, state, data = marshal.loads(file(filename, 'rb').read())
+
+    except (IOError, EOFError, ValueError, TypeError):
+        return None, None
+
+    if SNAPSHOT_VERSION != version:
+        return None, None
+
+    return state, decode_stations(data)
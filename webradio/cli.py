@@ -1,7 +1,6 @@
 from dbus.mainloop.glib import DBusGMainLoop
 from sys                import argv
 from webradio.client    import Client
-from webradio.ui        import MainWindow
 
 __commands__ = []
 
@@ -11,7 +10,18 @@ def command(fun):
 
 class CommandLineClient(object):
     def __init__(self):
-        self.__client = Client()
+        self.__client_instance = None
+
+    def __get_client(self, light=False):
+        client = self.__client_instance
+
+        if client is None or (client.light and not light):
+            client = self.__client_instance = Client(light=light)
+
+        return client
+
+    __client = property(fget=__get_client)
+    __light_client = property(fget=lambda self: self.__get_client(light=True))
 
     @staticmethod
     def list_channels(channels):
@@ -26,25 +36,38 @@ class CommandLineClient(object):
                 ['%s: %s' % (s.id, s.title)] +
                 ['%s [%s]' % (c.title, ' '.join(c.tags)) for c in l])
 
+    @staticmethod
+    def list_matches(matches):
+        station_id = None
+
+        for m in matches:
+            if m['station'] != station_id:
+                station_id = m['station']
+                print '%s: %s' % (station_id, m['station_title'])
+
+            print ' - %s [%s]' % (m['title'], ' '.join(m['tags']))
+
     @command
     def list(self, args):
         '''List matching stations'''
 
-        self.__client.wait(Client.STATE_CHANNELS_LOADED)
-        channels = self.__client.find_channels(args[2:])
-        self.list_channels(channels)
+        client = self.__light_client
+        client.wait(Client.STATE_CHANNELS_LOADED)
+        fields = 'station', 'station_title', 'title', 'tags'
+        self.list_matches(client.iter_matches(args[2:], fields))
 
     @command
     def status(self, args=None):
         '''Print service status'''
 
-        state = self.__client.is_playing and 'playing' or 'paused'
-        channel = self.__client.current_channel
+        client = self.__light_client
+        state = client.is_playing and 'playing' or 'paused'
+        channel = client.get_current_channel(['title', 'station_title', 'tags'])
 
-        if channel is not None:
+        if channel:
             state += (': "%s" from "%s" [%s]' % (
-                channel.title, channel.station.title,
-                ' '.join(channel.tags)))
+                channel['title'], channel['station_title'],
+                ' '.join(channel['tags'])))
 
         print state
 
@@ -53,10 +76,10 @@ class CommandLineClient(object):
         '''Select equalizer profile'''
 
         if 3 == len(args):
-            self.__client.equalizer_profile = args[2]
+            self.__light_client.equalizer_profile = args[2]
 
         else:
-            profiles = self.__client.get_equalizer_profiles()
+            profiles = self.__light_client.get_equalizer_profiles()
             profiles = ' '.join(profiles)
 
             print 'Supported profiles: %s' % profiles
@@ -82,12 +105,12 @@ class CommandLineClient(object):
     @command
     def pause(self, args):
         '''Pause music player'''
-        self.__client.pause()
+        self.__light_client.pause()
 
     @command
     def resume(self, args):
         '''Resume music player'''
-        self.__client.resume()
+        self.__light_client.resume()
 
     @command
     def tags(self, args):
@@ -100,6 +123,8 @@ class CommandLineClient(object):
     @command
     def ui(self, args):
         '''Run user interface'''
+
+        from webradio.ui import MainWindow
         MainWindow(self.__client).run()
 
     @command
@@ -123,7 +148,7 @@ class CommandLineClient(object):
     def quit(self, args):
         '''Stop the background service'''
 
-        self.__client.quit()
+        self.__light_client.quit()
 
     def run(self, args):
         command_name = len(args) > 1 and args[1]
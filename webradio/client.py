@@ -1,8 +1,10 @@
-from dbus             import Interface, SessionBus
-from glib             import MainLoop, timeout_add, source_remove
-from gobject          import GObject, SIGNAL_RUN_LAST, TYPE_NONE
-from webradio.model   import Channel, Station, Stream
-from webradio.service import Service
+from dbus               import Interface, SessionBus
+from glib               import MainLoop, timeout_add, source_remove
+from gobject            import GObject, SIGNAL_RUN_LAST, TYPE_NONE
+from webradio.catalog   import load_snapshot, save_snapshot
+from webradio.constants import SERVICE_INTERFACE, SERVICE_NAME
+from webradio.model     import Channel, Station, Stream
+from webradio.xdg       import get_cache_filename
 
 import sys
 
@@ -16,6 +18,8 @@ class Client(GObject):
     __gsignals__ = {
         'station-added':       (SIGNAL_RUN_LAST, TYPE_NONE, (object,)),
         'channel-added':       (SIGNAL_RUN_LAST, TYPE_NONE, (object,)),
+        'channel-removed':     (SIGNAL_RUN_LAST, TYPE_NONE, (object,)),
+        'station-removed':     (SIGNAL_RUN_LAST, TYPE_NONE, (object,)),
         'state-changed':       (SIGNAL_RUN_LAST, TYPE_NONE, ()),
         'stream-tags-changed': (SIGNAL_RUN_LAST, TYPE_NONE, ()),
     }
@@ -29,9 +33,11 @@ class Client(GObject):
         streams = [cls.decode_stream(*s) for s in streams]
         return Channel(station, uri, tags, streams)
 
-    def __init__(self):
+    def __init__(self, light=False):
         super(Client, self).__init__()
 
+        self.__light = light
+
         self.__stations = dict()
         self.__channels = dict()
         self.__stream_tags = dict()
@@ -39,25 +45,44 @@ class Client(GObject):
         self.__current_channel = None
         self.__is_playing = False
 
+        def unregister_channel(channel):
+            if channel.station:
+                channel.station.channels.remove(channel)
+
+            if self.__channels.get(channel.uri) is channel:
+                del self.__channels[channel.uri]
+
+            self.emit('channel-removed', channel)
+
         def register_channel(station, channel):
+            previous = self.__channels.get(channel.uri)
+
+            if previous is not None and previous is not channel:
+                unregister_channel(previous)
             if station:
                 station.channels.append(channel)
 
-            for stream in channel.streams:
-                self.__channels[stream.uri] = channel
-
             self.__channels[channel.uri] = channel
 
+        def register_station(station):
+            for channel in station.channels:
+                register_channel(None, channel)
+
+            self.__stations[station.id] = station
+            self.emit('station-added', station)
+
         def station_added_cb(station):
             id, title, uri, channels = station
-            station = Station(id, title, uri)
+            station = self.__stations.get(id)
+
+            if station is None:
+                station = Station(id, title, uri)
+                register_station(station)
 
             for channel in channels:
                 channel = self.decode_channel(station, *channel)
                 register_channel(station, channel)
-
-            self.__stations[station.id] = station
-            self.emit('station-added', station)
+                self.emit('channel-added', channel)
 
         def channel_added_cb(station_id, channel):
             station = self.find_station(station_id)
@@ -65,12 +90,32 @@ class Client(GObject):
             register_channel(station, channel)
             self.emit('channel-added', channel)
 
-        def state_changed_cb(playing, stream_uri):
-            self.__stream_tags = self.__service.GetStreamTags()
-            self.__current_channel = self.__channels.get(stream_uri)
+        def channel_removed_cb(station_id, channel_uri):
+            channel = self.__channels.get(channel_uri)
+
+            if channel is not None:
+                unregister_channel(channel)
+
+        def station_removed_cb(station_id):
+            station = self.__stations.pop(station_id, None)
+
+            if station is not None:
+                for channel in list(station.channels):
+                    unregister_channel(channel)
+
+                self.emit('station-removed', station)
+
+        def stream_tags_cb(tags):
+            self.__stream_tags = dict(tags)
+            self.emit('stream-tags-changed')
+
+        def state_changed_cb(playing, stream_uri, station_id, channel_uri):
+            self.__current_channel = self.__channels.get(channel_uri)
             self.__is_playing = playing
             self.emit('state-changed')
 
+            self.get_stream_tags_async(stream_tags_cb)
+
         def stream_tags_changed_cb(tags):
             self.__stream_tags.update(tags)
             self.emit('stream-tags-changed')
@@ -81,17 +126,45 @@ class Client(GObject):
                 from gtk import main_quit
                 main_quit()
 
+        self.__catalog_filename = get_cache_filename('client-catalog')
         self.__bus = SessionBus()
-        proxy = self.__bus.get_object(Service.name, '/')
-        self.__bus.watch_name_owner(Service.name, name_owner_cb)
-        self.__service = Interface(proxy, Service.interface)
-        self.__service.connect_to_signal('StationAdded',      station_added_cb)
-        self.__service.connect_to_signal('ChannelAdded',      channel_added_cb)
+        proxy = self.__bus.get_object(SERVICE_NAME, '/')
+        self.__bus.watch_name_owner(SERVICE_NAME, name_owner_cb)
+        self.__service = Interface(proxy, SERVICE_INTERFACE)
         self.__service.connect_to_signal('StateChanged',      state_changed_cb)
         self.__service.connect_to_signal('StreamTagsChanged', stream_tags_changed_cb)
 
-        for station in self.__service.GetStations():
-            station_added_cb(station)
+        if not light:
+            self.__service.connect_to_signal('StationAdded',   station_added_cb)
+            self.__service.connect_to_signal('ChannelAdded',   channel_added_cb)
+            self.__service.connect_to_signal('ChannelChanged', channel_added_cb)
+            self.__service.connect_to_signal('ChannelRemoved', channel_removed_cb)
+            self.__service.connect_to_signal('StationRemoved', station_removed_cb)
+
+            state, stations = load_snapshot(self.__catalog_filename)
+            epoch, generation = state or ('', 0)
+
+            changes = self.__service.GetChangesSince(epoch, generation)
+            new_epoch, new_generation, incremental = changes[:3]
+            new_stations, new_channels = changes[3:5]
+            removed_stations, removed_channels = changes[5:]
+
+            if incremental:
+                for station in stations or []:
+                    register_station(station)
+
+            for station_id in removed_stations:
+                station_removed_cb(station_id)
+            for station in new_stations:
+                station_added_cb(station)
+            for station_id, channel in new_channels:
+                channel_added_cb(station_id, channel)
+            for station_id, channel_uri in removed_channels:
+                channel_removed_cb(station_id, channel_uri)
+
+            if (new_epoch, new_generation) != (epoch, generation):
+                save_snapshot(self.__catalog_filename, self.__stations.values(),
+                              (str(new_epoch), int(new_generation)))
 
         state_changed_cb(*self.__service.GetState())
 
@@ -130,16 +203,67 @@ class Client(GObject):
             sys.stdout.write('\r\033[K')
             sys.stdout.flush()
 
-    def find_channels(self, query=[]):
+    @staticmethod
+    def __error_cb(error):
+        print >>sys.stderr, 'Service call failed: %s' % error
+
+    def __call_async(self, method, args, reply_cb=None, error_cb=None):
+        if reply_cb is None:
+            reply_cb = lambda *result: None
+        if error_cb is None:
+            error_cb = self.__error_cb
+
+        method(*args, reply_handler=reply_cb, error_handler=error_cb)
+
+    def __decode_matches(self, matches):
         result = list()
 
-        for station_id, channel in self.__service.Find(query):
+        for station_id, channel in matches:
             station = self.__stations.get(station_id)
             channel = self.decode_channel(station, *channel)
             result.append(channel)
 
         return result
 
+    def find_channels(self, query=[]):
+        return self.__decode_matches(self.__service.Find(query))
+
+    def find_channels_async(self, query, reply_cb, error_cb=None):
+        def find_cb(matches):
+            reply_cb(self.__decode_matches(matches))
+
+        self.__call_async(self.__service.Find, (query,), find_cb, error_cb)
+
+    def find_matches(self, query=[], offset=0, limit=-1, fields=[]):
+        return self.__service.FindPaged(query, offset, limit, fields)
+
+    def find_matches_async(self, query, offset, limit, fields,
+                           reply_cb, error_cb=None):
+        self.__call_async(self.__service.FindPaged,
+                          (query, offset, limit, fields),
+                          reply_cb, error_cb)
+
+    def iter_matches(self, query=[], fields=[], page_size=1000):
+        offset = 0
+
+        while True:
+            total, page = self.find_matches(query, offset, page_size, fields)
+
+            for match in page:
+                yield match
+
+            offset += len(page)
+
+            if not page or offset >= total:
+                break
+
+    def resolve_channel(self, channel):
+        uri, tags, streams = self.__service.ResolveChannel(channel.uri)
+        return self.decode_channel(channel.station, uri, tags, streams)
+
+    def get_current_channel(self, fields=[]):
+        return self.__service.GetCurrentChannel(fields)
+
     def find_station(self, id):
         return self.__stations.get(id)
     def get_stations(self):
@@ -147,15 +271,26 @@ class Client(GObject):
 
     def get_tags(self):
         return self.__service.GetTags()
+    def get_tags_async(self, reply_cb, error_cb=None):
+        self.__call_async(self.__service.GetTags, (), reply_cb, error_cb)
+
+    def get_stream_tags_async(self, reply_cb, error_cb=None):
+        self.__call_async(self.__service.GetStreamTags, (), reply_cb, error_cb)
 
     def play(self, channel):
-        self.__service.Play(channel.streams[0].uri)
+        self.__service.Play(channel.uri)
+    def play_async(self, channel, reply_cb=None, error_cb=None):
+        self.__call_async(self.__service.Play, (channel.uri,), reply_cb, error_cb)
 
     def pause(self):
         self.__service.Pause()
+    def pause_async(self, reply_cb=None, error_cb=None):
+        self.__call_async(self.__service.Pause, (), reply_cb, error_cb)
 
     def resume(self):
         self.__service.Resume()
+    def resume_async(self, reply_cb=None, error_cb=None):
+        self.__call_async(self.__service.Resume, (), reply_cb, error_cb)
 
     def quit(self):
         self.__service.Quit()
@@ -167,6 +302,7 @@ class Client(GObject):
     def __set_equalizer_profile(self, value):
         self.__service.SetEqualizerProfile(value)
 
+    light = property(fget=lambda self: self.__light)
     is_playing = property(fget=lambda self: self.__is_playing)
     current_channel = property(fget=lambda self: self.__current_channel)
     stream_tags = property(fget=lambda self: self.__stream_tags)
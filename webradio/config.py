@@ -5,11 +5,17 @@ import os
 
 class Configuration(object):
     def __init__(self):
-        self.__parser = SafeConfigParser()
-        self.__parser.add_section('WebRadio')
+        self.__parser = self.__create_parser()
+        self.__changes = dict()
 
         self.read()
 
+    @staticmethod
+    def __create_parser():
+        parser = SafeConfigParser()
+        parser.add_section('WebRadio')
+        return parser
+
     def read(self, target=None):
         if target is None:
             target = self.filename
@@ -21,6 +27,19 @@ class Configuration(object):
             target = self.filename
 
         if isinstance(target, str):
+            # other processes may have changed the file since we read it,
+            # so only our own changes get applied on top of its content
+            parser = self.__create_parser()
+            parser.read(target)
+
+            for (section, key), value in self.__changes.items():
+                if not parser.has_section(section):
+                    parser.add_section(section)
+
+                parser.set(section, key, value)
+
+            self.__parser = parser
+
             confdir = os.path.dirname(target)
 
             if not os.path.isdir(confdir):
@@ -29,6 +48,7 @@ class Configuration(object):
             target = file(target, 'w')
 
         self.__parser.write(target)
+        self.__changes.clear()
 
     def _get(self, section, key, default=None):
         if not section:
@@ -42,6 +62,7 @@ class Configuration(object):
         if not section:
             section = 'WebRadio'
 
+        self.__changes[section, key] = value
         return self.__parser.set(section, key, value)
 
     filename = property(
@@ -55,3 +76,30 @@ class Configuration(object):
         fget=lambda self: self._get(None, 'channel-uri'),
         fset=lambda self, value: self._set(None, 'channel-uri', value))
 
+    fetch_concurrency = property(
+        fget=lambda self: int(self._get(None, 'fetch-concurrency', 8)),
+        fset=lambda self, value: self._set(None, 'fetch-concurrency', str(value)))
+
+    fetch_host_limit = property(
+        fget=lambda self: int(self._get(None, 'fetch-host-limit', 2)),
+        fset=lambda self, value: self._set(None, 'fetch-host-limit', str(value)))
+
+    catalog_max_age = property(
+        fget=lambda self: int(self._get(None, 'catalog-max-age', 86400)),
+        fset=lambda self, value: self._set(None, 'catalog-max-age', str(value)))
+
+    refresh_interval = property(
+        fget=lambda self: int(self._get(None, 'refresh-interval', 21600)),
+        fset=lambda self, value: self._set(None, 'refresh-interval', str(value)))
+
+    lazy_channels = property(
+        fget=lambda self: self._get(None, 'lazy-channels', 'false').lower() in ('1', 'true', 'yes'),
+        fset=lambda self, value: self._set(None, 'lazy-channels', value and 'true' or 'false'))
+
+    buffer_size = property(
+        fget=lambda self: int(self._get(None, 'buffer-size', -1)),
+        fset=lambda self, value: self._set(None, 'buffer-size', str(value)))
+
+    buffer_duration = property(
+        fget=lambda self: int(self._get(None, 'buffer-duration', -1)),
+        fset=lambda self, value: self._set(None, 'buffer-duration', str(value)))
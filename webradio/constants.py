@@ -0,0 +1,2 @@
+SERVICE_NAME = 'de.taschenorakel.webradio'
+SERVICE_INTERFACE = '%s.Service' % SERVICE_NAME
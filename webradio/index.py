@@ -0,0 +1,247 @@
+from urlparse import urlsplit, urlunsplit
+
+_default_ports = {'http': 80, 'https': 443}
+
+def normalize_uri(uri):
+    try:
+        parts = urlsplit(uri.strip())
+        port = parts.port
+
+    except ValueError:
+        return uri
+
+    if not parts.hostname:
+        return uri
+
+    netloc = parts.hostname
+
+    if port and port != _default_ports.get(parts.scheme):
+        netloc = '%s:%d' % (netloc, port)
+    if parts.username:
+        netloc = '%s@%s' % (parts.username, netloc)
+
+    return urlunsplit((parts.scheme, netloc, parts.path or '/', parts.query, ''))
+
+class ChannelIndex(object):
+    compact_threshold = 1024
+
+    def __init__(self, ngram_size=3):
+        self.__ngram_size = ngram_size
+        self.__channels = list()
+        self.__titles = list()
+        self.__removed = 0
+        self.__serials = dict()
+        self.__uris = dict()
+        self.__aliases = dict()
+        self.__tags = dict()
+        self.__stations = dict()
+        self.__station_titles = dict()
+        self.__ngrams = dict()
+        self.__sorted_tags = None
+
+    def __get_ngrams(self, text):
+        n = self.__ngram_size
+
+        if len(text) < n:
+            return set([text])
+
+        return set([text[i:i + n] for i in range(len(text) - n + 1)])
+
+    def __add_key(self, table, key, serial):
+        serials = table.get(key)
+
+        if serials is None:
+            serials = table[key] = set()
+
+        serials.add(serial)
+
+    def __remove_key(self, table, key, serial):
+        serials = table.get(key)
+
+        if serials is not None:
+            serials.discard(serial)
+
+            if not serials:
+                del table[key]
+                return True
+
+        return False
+
+    def __register_station(self, station):
+        if station.id not in self.__station_titles:
+            self.__station_titles[station.id] = station.title
+            self.__stations.setdefault(station.id, set())
+            self.__sorted_tags = None
+
+    def add_station(self, station):
+        self.__register_station(station)
+
+        for channel in station.channels:
+            self.add_channel(channel)
+
+    def add_channel(self, channel):
+        if channel in self.__serials:
+            return
+
+        self.__register_station(channel.station)
+
+        serial = len(self.__channels)
+        title = channel.title or ''
+        self.__channels.append(channel)
+        self.__titles.append(title)
+        self.__serials[channel] = serial
+
+        for stream in channel.streams:
+            self.__uris[normalize_uri(stream.uri)] = serial
+
+        self.__uris[normalize_uri(channel.uri)] = serial
+
+        for tag in channel.tags:
+            if tag not in self.__tags:
+                self.__sorted_tags = None
+
+            self.__add_key(self.__tags, tag, serial)
+        for ngram in self.__get_ngrams(title):
+            self.__add_key(self.__ngrams, ngram, serial)
+
+        self.__add_key(self.__stations, channel.station.id, serial)
+
+    def remove_channel(self, channel):
+        serial = self.__serials.pop(channel, None)
+
+        if serial is None:
+            return
+
+        for tag in channel.tags:
+            if self.__remove_key(self.__tags, tag, serial):
+                self.__sorted_tags = None
+        for ngram in self.__get_ngrams(self.__titles[serial]):
+            self.__remove_key(self.__ngrams, ngram, serial)
+
+        for uri in [channel.uri] + [s.uri for s in channel.streams]:
+            uri = normalize_uri(uri)
+
+            if self.__uris.get(uri) == serial:
+                del self.__uris[uri]
+
+        self.__stations[channel.station.id].discard(serial)
+        self.__channels[serial] = None
+        self.__titles[serial] = None
+        self.__removed += 1
+
+        if (self.__removed > self.compact_threshold and
+            2 * self.__removed > len(self.__channels)):
+            self.__compact()
+
+    def __compact(self):
+        # serials are list positions, so renumber the remaining channels
+        # in their current order instead of keeping placeholders around
+        channels = [c for c in self.__channels if c is not None]
+
+        self.__channels = list()
+        self.__titles = list()
+        self.__serials = dict()
+        self.__uris = dict()
+        self.__tags = dict()
+        self.__ngrams = dict()
+        self.__sorted_tags = None
+        self.__removed = 0
+
+        for serials in self.__stations.values():
+            serials.clear()
+
+        for channel in channels:
+            self.add_channel(channel)
+
+    def remove_station(self, station):
+        for channel in station.channels:
+            self.remove_channel(channel)
+
+        self.__station_titles.pop(station.id, None)
+        self.__stations.pop(station.id, None)
+        self.__sorted_tags = None
+
+    def add_alias(self, alias, uri):
+        alias, uri = normalize_uri(alias), normalize_uri(uri)
+
+        if alias != uri:
+            self.__aliases[alias] = uri
+
+    def lookup(self, uri):
+        uri = normalize_uri(uri)
+        serial = self.__uris.get(uri)
+
+        if serial is None:
+            serial = self.__uris.get(self.__aliases.get(uri))
+
+        if serial is None:
+            return None
+
+        return self.__channels[serial]
+
+    def __find_titles(self, q):
+        if len(q) < self.__ngram_size:
+            result = set()
+
+            for ngram, serials in self.__ngrams.iteritems():
+                if ngram.find(q) >= 0:
+                    result.update(serials)
+
+            return result
+
+        candidates = None
+
+        for ngram in sorted(self.__get_ngrams(q),
+                            key=lambda g: len(self.__ngrams.get(g, ()))):
+            serials = self.__ngrams.get(ngram)
+
+            if not serials:
+                return set()
+
+            if candidates is None:
+                candidates = set(serials)
+            else:
+                candidates.intersection_update(serials)
+
+        return set([i for i in candidates
+                    if self.__titles[i].find(q) >= 0])
+
+    def __find_criterion(self, q):
+        result = self.__find_titles(q)
+        result.update(self.__tags.get(q, ()))
+        result.update(self.__stations.get(q, ()))
+
+        for station_id, title in self.__station_titles.iteritems():
+            if title.find(q) >= 0:
+                result.update(self.__stations[station_id])
+
+        return result
+
+    def find(self, query):
+        result = None
+
+        for q in query:
+            matches = self.__find_criterion(q)
+
+            if result is None:
+                result = matches
+            else:
+                result.intersection_update(matches)
+
+            if not result:
+                return []
+
+        if result is None:
+            return [c for c in self.__channels if c is not None]
+
+        return [self.__channels[i] for i in sorted(result)]
+
+    def _get_tags(self):
+        if self.__sorted_tags is None:
+            tags = set(self.__tags)
+            tags.update(self.__station_titles)
+            self.__sorted_tags = sorted(tags)
+
+        return self.__sorted_tags
+
+    tags = property(fget=_get_tags)
@@ -1,38 +1,108 @@
+from operator import itemgetter
+
 import re
+import sre_constants
+import sre_parse
 import urlparse
 
-class Stream(object):
-    dbus_signature  = '(ssi)'
+PLAYLIST_SUFFIXES = '.pls', '.m3u', '.m3u8', '.xspf'
 
-    def __init__(self, uri, title, length):
-        self.__uri    = uri
-        self.__title  = title
-        self.__length = length
+_tags = dict()
 
-    def __iter__(self):
-        yield self.uri
-        yield self.title
-        yield self.length
+def intern_tag(tag):
+    return _tags.setdefault(tag, tag)
+
+def _get_literal(pattern):
+    try:
+        parsed = sre_parse.parse(pattern)
+
+    except sre_constants.error:
+        return None
+
+    if parsed.pattern.flags & ~sre_parse.SRE_FLAG_UNICODE:
+        return None
+
+    chars = list()
+
+    for op, av in parsed:
+        if sre_constants.LITERAL != op:
+            return None
+
+        chars.append(unichr(av))
+
+    literal = u''.join(chars)
+
+    if isinstance(pattern, str):
+        literal = literal.encode('latin-1')
+
+    return literal
+
+def _is_ascii(text):
+    try:
+        if isinstance(text, unicode):
+            text.encode('ascii')
+        else:
+            text.decode('ascii')
+
+    except UnicodeError:
+        return False
+
+    return True
+
+def _compile_noise_step(pattern):
+    literal = _get_literal(pattern)
+    regex = re.compile(pattern)
+
+    if literal is None or _is_ascii(literal):
+        return literal, None, regex
+
+    # mixing non-ASCII byte strings and unicode must not go through
+    # str.replace(), which would try to decode the byte string
+    return literal, type(literal), regex
+
+def _apply_noise_step(step, text):
+    literal, literal_type, regex = step
 
-    uri    = property(fget=lambda self: self.__uri)
-    title  = property(fget=lambda self: self.__title)
-    length = property(fget=lambda self: self.__length)
+    if literal is not None and (literal_type is None or
+                                type(text) is literal_type):
+        return text.replace(literal, '').strip()
+
+    return regex.sub('', text).strip()
+
+def compile_noise_filter(pattern):
+    step = _compile_noise_step(pattern)
+    return lambda text: _apply_noise_step(step, text)
+
+class Stream(tuple):
+    __slots__ = ()
+
+    dbus_signature  = '(ssi)'
+
+    def __new__(cls, uri, title, length):
+        return tuple.__new__(cls, (uri, title, length))
+
+    uri    = property(fget=itemgetter(0))
+    title  = property(fget=itemgetter(1))
+    length = property(fget=itemgetter(2))
 
 class Channel(object):
+    __slots__ = '__station', '__uri', '__tags', '__streams'
+
     dbus_signature = '(sasa' + Stream.dbus_signature + ')'
 
     def __init__(self, station, uri, tags=None, streams=None):
         self.__station = station
         self.__uri     = uri
-        self.__tags    = tags
         self.__streams = streams
 
-        aliases = station.aliases
-
-        if self.__tags is None:
+        if tags is None:
+            aliases = station.aliases
             path = urlparse.urlparse(uri)[2].split('/')
-            self.__tags = [aliases.get(t, t) for t in
-                           path[1:-1] + path[-1].split('.')[:-1]]
+            tags = [aliases.get(t, t) for t in
+                    path[1:-1] + path[-1].split('.')[:-1]]
+
+        self.__tags = tuple([intern_tag(t) for t in tags])
+
         if self.__streams is None:
             self.__streams = []
 
@@ -73,20 +143,41 @@ class Channel(object):
     title   = property(fget=_get_title)
 
 class Station(object):
+    __slots__ = ('__id', '__title', '__uri', '__stream_uri', '__channels',
+                 '__aliases', '__noise_filters', '__noise_pipeline',
+                 '__noise_cache')
+
     dbus_signature = '(sssa' + Channel.dbus_signature + ')'
 
+    __no_aliases = dict()
+
     def __init__(self, id, title, uri, channels = None):
-        self.__id         = id
-        self.__title      = title
-        self.__uri        = uri
-        self.__stream_uri = None
-        self.__channels   = channels if channels is not None else []
-        self.__aliases    = dict()
-
-        self.__noise_filters = [
-            re.compile(re.escape(self.title)),
-            re.compile(r'(^\s*-\s*|\s*-\s*$)')
-        ]
+        self.__id            = id
+        self.__title         = title
+        self.__uri           = uri
+        self.__stream_uri    = None
+        self.__channels      = channels if channels is not None else []
+        self.__aliases       = Station.__no_aliases
+        self.__noise_filters = None
+        self.__noise_pipeline = None
+        self.__noise_cache = None
+
+    def __get_noise_filters(self):
+        if self.__noise_filters is None:
+            self.__noise_filters = [
+                re.escape(self.title),
+                r'(^\s*-\s*|\s*-\s*$)'
+            ]
+
+        return self.__noise_filters
+
+    def __get_noise_pipeline(self):
+        if self.__noise_pipeline is None:
+            self.__noise_cache = dict()
+            self.__noise_pipeline = [_compile_noise_step(p) for p
+                                     in self.__get_noise_filters()]
+
+        return self.__noise_pipeline
 
     def __iter__(self):
         yield self.id
@@ -95,7 +186,7 @@ class Station(object):
         yield self.channels
 
     def accept_stream(self, uri):
-        if not uri.endswith('.pls'):
+        if not uri.lower().endswith(PLAYLIST_SUFFIXES):
             return False
         if self.__stream_uri and uri.startswith(self.__stream_uri):
             return True
@@ -103,20 +194,49 @@ class Station(object):
         return uri.startswith(self.uri)
 
     def add_noise_filter(self, pattern):
-        self.__noise_filters.insert(-2, re.compile(pattern))
+        re.compile(pattern)
+
+        self.__get_noise_filters().insert(-2, pattern)
+        self.__noise_pipeline = None
 
     def filter_noise(self, text):
-        for f in self.__noise_filters:
-            text = f.subn('', text)[0].strip()
+        pipeline = self.__get_noise_pipeline()
+        cache = self.__noise_cache
+        result = cache.get(text)
+
+        if result is None:
+            result = text
+
+            # _apply_noise_step() inlined, this runs for every new title
+            for literal, literal_type, regex in pipeline:
+                if literal is not None and (literal_type is None or
+                                            type(result) is literal_type):
+                    result = result.replace(literal, '').strip()
+                else:
+                    result = regex.sub('', result).strip()
+
+            if len(cache) > 4096:
+                cache.clear()
 
-        return text
+            cache[text] = result
+
+        return result
 
     def add_alias(self, name, value):
-        self.__aliases[name] = value
+        if self.__aliases is Station.__no_aliases:
+            self.__aliases = dict()
+
+        self.__aliases[name] = intern_tag(value)
 
     def _set_stream_uri(self, uri):
         self.__stream_uri = uri
 
+    def _get_noise_filters(self):
+        if self.__noise_filters is None:
+            return ()
+
+        return tuple(self.__noise_filters[:-2])
+
     id         = property(fget=lambda self: self.__id)
     title      = property(fget=lambda self: self.__title)
     uri        = property(fget=lambda self: self.__uri)
@@ -124,3 +244,5 @@ class Station(object):
     channels   = property(fget=lambda self: self.__channels)
     aliases    = property(fget=lambda self: self.__aliases)
 
+    noise_filters = property(fget=_get_noise_filters)
+
@@ -11,8 +11,10 @@ class Player(gst.Pipeline):
     def __init__(self):
         super(Player, self).__init__()
 
+        self.__buffer_size = -1
+        self.__buffer_duration = -1
+
         elements = [
-            ('uridecodebin',     'decoder'),
             ('audioconvert',     'converter'),
             ('volume',           'volume'),
             ('equalizer-3bands', 'equalizer'),
@@ -22,22 +24,43 @@ class Player(gst.Pipeline):
         for factory, name in elements:
             self.add(gst.element_factory_make(factory, name))
 
+        gst.element_link_many(*[self.get_by_name(name)
+                                for factory, name in elements])
+
+        self.__add_decoder()
+        self.profile = 'pop'
+
+    def __add_decoder(self):
         def pad_added_cb(decoder, pad):
-            converter = self.get_by_name('converter')
-            volume    = self.get_by_name('volume')
-            equalizer = self.get_by_name('equalizer')
-            audiosink = self.get_by_name('audiosink')
+            sink = self.get_by_name('converter').get_static_pad('sink')
+
+            if not sink.is_linked():
+                pad.link(sink)
+
+        decoder = gst.element_factory_make('uridecodebin', 'decoder')
+        decoder.connect('pad_added', pad_added_cb)
+        decoder.set_property('buffer-size', self.__buffer_size)
+        decoder.set_property('buffer-duration', self.__buffer_duration)
+        self.add(decoder)
 
-            pad.link(converter.get_static_pad('sink'))
+        return decoder
 
-            converter.link(volume)
-            volume   .link(equalizer)
-            equalizer.link(audiosink)
+    def switch_uri(self, uri):
+        if gst.STATE_PAUSED > self.get_state(0)[1]:
+            self.set_state(gst.STATE_NULL)
+            self.uri = uri
+            self.set_state(gst.STATE_PLAYING)
+            return
+
+        self.set_state(gst.STATE_PAUSED)
 
         decoder = self.get_by_name('decoder')
-        decoder.connect('pad_added', pad_added_cb)
+        decoder.set_state(gst.STATE_NULL)
+        self.remove(decoder)
 
-        self.profile = 'pop'
+        self.__add_decoder().set_property('uri', uri)
+        self.set_new_stream_time(0)
+        self.set_state(gst.STATE_PLAYING)
 
     @classmethod
     def get_profile_names(cls):
@@ -65,6 +88,18 @@ class Player(gst.Pipeline):
     def __get_uri(self):
         return self.__get('decoder', 'uri')
 
+    def __set_buffer_size(self, value):
+        self.__buffer_size = value
+        self.__set('decoder', 'buffer-size', value)
+    def __get_buffer_size(self):
+        return self.__buffer_size
+
+    def __set_buffer_duration(self, value):
+        self.__buffer_duration = value
+        self.__set('decoder', 'buffer-duration', value)
+    def __get_buffer_duration(self):
+        return self.__buffer_duration
+
     def __set_volume(self, value):
         self.__set('volume', 'volume', value)
     def __get_volume(self):
@@ -99,5 +134,8 @@ class Player(gst.Pipeline):
     uri     = property(fget=__get_uri,     fset=__set_uri)
     volume  = property(fget=__get_volume,  fset=__set_volume)
 
+    buffer_size     = property(fget=__get_buffer_size,     fset=__set_buffer_size)
+    buffer_duration = property(fget=__get_buffer_duration, fset=__set_buffer_duration)
+
 if '__main__' == __name__:
     Player().run(sys.argv[1])
@@ -0,0 +1,112 @@
+from StringIO       import StringIO
+from urlparse       import urljoin
+from webradio.model import Stream
+from xml.etree      import cElementTree
+
+import re
+
+_pls_key = re.compile(r'^(file|title|length)(\d+)$')
+
+def _make_stream(uri, title, length, title_filter, base_uri):
+    if base_uri:
+        uri = urljoin(base_uri, uri)
+    if title and title_filter:
+        title = title_filter(title)
+    if title is None:
+        title = ''
+
+    try:
+        length = int(length)
+
+    except (TypeError, ValueError):
+        length = -1
+
+    return Stream(uri, title, length)
+
+def parse_pls(content, title_filter=None, base_uri=None):
+    entries = dict()
+
+    for line in content.splitlines():
+        key, sep, value = line.partition('=')
+
+        if not sep:
+            continue
+
+        match = _pls_key.match(key.strip().lower())
+
+        if match:
+            name, index = match.groups()
+            entry = entries.setdefault(int(index), dict())
+            entry[name] = value.strip()
+
+    for index in sorted(entries):
+        entry = entries[index]
+
+        if entry.get('file'):
+            yield _make_stream(entry['file'], entry.get('title'),
+                               entry.get('length'), title_filter, base_uri)
+
+def parse_m3u(content, title_filter=None, base_uri=None):
+    title, length = None, None
+
+    for line in content.splitlines():
+        line = line.strip()
+
+        if line.startswith('#EXTINF:'):
+            length, sep, title = line[8:].partition(',')
+
+            if not sep:
+                title = None
+
+        elif line and not line.startswith('#'):
+            yield _make_stream(line, title, length, title_filter, base_uri)
+            title, length = None, None
+
+def parse_xspf(content, title_filter=None, base_uri=None):
+    track = None
+
+    for event, element in cElementTree.iterparse(StringIO(content),
+                                                 ('start', 'end')):
+        tag = element.tag.rsplit('}', 1)[-1]
+
+        if 'track' == tag:
+            if 'start' == event:
+                track = dict()
+
+            else:
+                if track.get('location'):
+                    try:
+                        length = int(track.get('duration')) / 1000
+
+                    except (TypeError, ValueError):
+                        length = -1
+
+                    yield _make_stream(track['location'], track.get('title'),
+                                       length, title_filter, base_uri)
+
+                track = None
+                element.clear()
+
+        elif 'end' == event and track is not None:
+            if tag in ('location', 'title', 'duration') and tag not in track:
+                track[tag] = (element.text or '').strip()
+
+def parse(content, uri=None, title_filter=None):
+    head = content.lstrip()[:64].lower()
+
+    if head.startswith('[playlist]'):
+        return parse_pls(content, title_filter, uri)
+    if head.startswith('<?xml') or head.startswith('<playlist'):
+        return parse_xspf(content, title_filter, uri)
+    if head.startswith('#extm3u'):
+        return parse_m3u(content, title_filter, uri)
+
+    if uri is not None:
+        suffix = uri.lower()
+
+        if suffix.endswith('.pls'):
+            return parse_pls(content, title_filter, uri)
+        if suffix.endswith('.xspf'):
+            return parse_xspf(content, title_filter, uri)
+
+    return parse_m3u(content, title_filter, uri)
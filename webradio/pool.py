@@ -0,0 +1,104 @@
+from collections import deque
+from threading   import Condition, Thread
+from urlparse    import urlparse
+
+import traceback
+
+class WorkerPool(object):
+    def __init__(self, concurrency=8, host_limit=2):
+        self.__condition = Condition()
+        self.__host_limit = max(1, host_limit)
+        self.__queues = dict()
+        self.__active = dict()
+        self.__ready = deque()
+        self.__ready_hosts = set()
+        self.__unfinished = 0
+
+        for i in range(max(1, concurrency)):
+            worker = Thread(target=self.__run)
+            worker.setDaemon(True)
+            worker.start()
+
+    def __mark_ready(self, host):
+        if (host not in self.__ready_hosts and self.__queues.get(host) and
+            self.__active.get(host, 0) < self.__host_limit):
+            self.__ready_hosts.add(host)
+            self.__ready.append(host)
+            self.__condition.notifyAll()
+
+    def __next_task(self):
+        self.__condition.acquire()
+
+        try:
+            while not self.__ready:
+                self.__condition.wait()
+
+            # hosts take turns, so a long queue for one host
+            # never blocks workers that could serve other hosts
+            host = self.__ready.popleft()
+            self.__ready_hosts.discard(host)
+            task = self.__queues[host].popleft()
+
+            if not self.__queues[host]:
+                del self.__queues[host]
+
+            self.__active[host] = self.__active.get(host, 0) + 1
+            self.__mark_ready(host)
+
+            return host, task
+
+        finally:
+            self.__condition.release()
+
+    def __task_done(self, host):
+        self.__condition.acquire()
+
+        try:
+            self.__active[host] -= 1
+
+            if not self.__active[host]:
+                del self.__active[host]
+
+            self.__unfinished -= 1
+            self.__mark_ready(host)
+
+            if not self.__unfinished:
+                self.__condition.notifyAll()
+
+        finally:
+            self.__condition.release()
+
+    def __run(self):
+        while True:
+            host, (uri, callback, args) = self.__next_task()
+
+            try:
+                callback(uri, *args)
+
+            except:
+                traceback.print_exc()
+
+            self.__task_done(host)
+
+    def submit(self, uri, callback, *args):
+        host = urlparse(uri)[1].lower()
+
+        self.__condition.acquire()
+
+        try:
+            self.__queues.setdefault(host, deque()).append((uri, callback, args))
+            self.__unfinished += 1
+            self.__mark_ready(host)
+
+        finally:
+            self.__condition.release()
+
+    def join(self):
+        self.__condition.acquire()
+
+        try:
+            while self.__unfinished:
+                self.__condition.wait()
+
+        finally:
+            self.__condition.release()
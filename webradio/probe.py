@@ -0,0 +1,105 @@
+from glib      import idle_add
+from threading import Thread
+from urlparse  import urlsplit
+
+import socket
+import time
+
+def probe_stream(uri, timeout=5):
+    parts = urlsplit(uri)
+
+    if 'http' != parts.scheme or not parts.hostname:
+        return None
+
+    path = parts.path or '/'
+
+    if parts.query:
+        path += '?' + parts.query
+
+    request = ('GET %s HTTP/1.0\r\n'
+               'Host: %s\r\n'
+               'User-Agent: webradio\r\n'
+               'Icy-MetaData: 0\r\n'
+               '\r\n') % (path, parts.netloc)
+
+    start = time.time()
+
+    try:
+        sock = socket.create_connection((parts.hostname, parts.port or 80),
+                                        timeout)
+
+        try:
+            sock.sendall(request)
+            status = sock.recv(1024).split('\r\n', 1)[0].split()
+
+        finally:
+            sock.close()
+
+    except (socket.error, socket.timeout):
+        return None
+
+    if len(status) < 2 or not status[1].startswith('2'):
+        return None
+
+    return time.time() - start
+
+class MirrorSelector(object):
+    def __init__(self, uris, callback, timeout=5):
+        self.__ranked = list()
+        self.__failed = list()
+        self.__tried = set()
+        self.__timings = dict()
+        self.__callback = callback
+        self.__cancelled = False
+        self.__pending = 0
+
+        if len(uris) < 2:
+            self.__ranked.extend(uris)
+            return
+
+        for uri in uris:
+            self.__pending += 1
+
+            worker = Thread(target=self.__probe, args=(uri, timeout))
+            worker.setDaemon(True)
+            worker.start()
+
+    def __probe(self, uri, timeout):
+        elapsed = probe_stream(uri, timeout)
+        idle_add(self.__probed, uri, elapsed)
+
+    def __probed(self, uri, elapsed):
+        if self.__cancelled:
+            return False
+
+        self.__pending -= 1
+
+        if elapsed is None:
+            self.__failed.append(uri)
+        else:
+            self.__timings[uri] = elapsed
+            self.__ranked.append(uri)
+
+        self.__callback(self)
+
+        return False
+
+    def cancel(self):
+        self.__cancelled = True
+
+    def next(self):
+        candidates = self.__ranked
+
+        if not self.__pending:
+            candidates = candidates + self.__failed
+
+        for uri in candidates:
+            if uri not in self.__tried:
+                self.__tried.add(uri)
+                return uri
+
+        return None
+
+    pending  = property(fget=lambda self: self.__pending)
+    timings  = property(fget=lambda self: self.__timings)
+    failures = property(fget=lambda self: len(self.__failed))
@@ -0,0 +1,141 @@
+from HTMLParser import HTMLParser, HTMLParseError
+from urlparse   import urljoin
+
+import httplib
+import json
+import re
+import urllib2
+
+def open_stream(uri, timeout=30):
+    return urllib2.urlopen(uri, timeout=timeout)
+
+class Scraper(object):
+    name = None
+
+    def __init__(self, options=None):
+        self.options = options or dict()
+
+    def get_uri(self, station):
+        return self.options.get('uri') or station.uri
+
+    def scrape(self, uri, fetch, stream=open_stream):
+        response, content = fetch(uri)
+
+        if 200 != response.status:
+            return None
+
+        links = self.extract(content)
+
+        if links is None:
+            return None
+
+        return [urljoin(uri, link) for link in links]
+
+class RegexScraper(Scraper):
+    name = 'regex'
+
+    default_pattern = r'href="([^"]+\.(?:pls|m3u8?|xspf))"'
+    __patterns = dict()
+
+    def __init__(self, options=None):
+        super(RegexScraper, self).__init__(options)
+
+        pattern = self.options.get('pattern') or self.default_pattern
+        regex = RegexScraper.__patterns.get(pattern)
+
+        if regex is None:
+            regex = re.compile(pattern, re.I)
+
+            if 1 != regex.groups:
+                raise ValueError('Scraper pattern must have exactly one '
+                                 'group: %s' % pattern)
+
+            RegexScraper.__patterns[pattern] = regex
+
+        self.__regex = regex
+
+    def extract(self, content):
+        return self.__regex.findall(content)
+
+class JsonScraper(Scraper):
+    name = 'json'
+
+    def __collect(self, node, key, links):
+        if isinstance(node, dict):
+            for name, value in node.iteritems():
+                if name == key and isinstance(value, basestring):
+                    links.append(value)
+                else:
+                    self.__collect(value, key, links)
+
+        elif isinstance(node, list):
+            for value in node:
+                self.__collect(value, key, links)
+
+    def extract(self, content):
+        try:
+            document = json.loads(content)
+
+        except ValueError:
+            return None
+
+        links = []
+        self.__collect(document, self.options.get('key') or 'url', links)
+
+        return links
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if 'a' == tag:
+            for name, value in attrs:
+                if 'href' == name and value:
+                    self.links.append(value)
+
+class HtmlScraper(Scraper):
+    name = 'html'
+
+    chunk_size = 16384
+
+    def scrape(self, uri, fetch, stream=open_stream):
+        parser = _LinkParser()
+
+        try:
+            response = stream(uri)
+
+            try:
+                while True:
+                    chunk = response.read(self.chunk_size)
+
+                    if not chunk:
+                        break
+
+                    parser.feed(chunk)
+
+                parser.close()
+
+            finally:
+                response.close()
+
+        except HTMLParseError, e:
+            print 'Cannot parse %s: %s' % (uri, e)
+
+        except (httplib.HTTPException, IOError), e:
+            print 'Cannot fetch %s: %s' % (uri, e)
+            return None
+
+        return [urljoin(uri, link) for link in parser.links]
+
+_backends = dict([(cls.name, cls) for cls
+                  in (RegexScraper, JsonScraper, HtmlScraper)])
+
+def create_scraper(name=None, options=None):
+    backend = _backends.get(name or RegexScraper.name)
+
+    if backend is None:
+        raise ValueError('Unknown scraper backend: %s' % name)
+
+    return backend(options)
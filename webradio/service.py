@@ -1,38 +1,151 @@
 from ConfigParser       import SafeConfigParser
-from dbus               import Interface, SessionBus
+from dbus               import Array, Dictionary, Interface, SessionBus
 from dbus.mainloop.glib import DBusGMainLoop
 from dbus.service       import BusName, Object, method, signal
-from glib               import MainLoop, idle_add, source_remove, timeout_add_seconds
+from glib               import MainLoop, idle_add, source_remove, timeout_add, timeout_add_seconds
 from gtk.gdk            import threads_init
+from heapq              import nlargest
 from httplib2           import Http
-from threading          import Thread
+from operator           import itemgetter
+from threading          import Lock, Thread, local
 from urlparse           import urljoin
+from webradio.catalog   import load_snapshot, save_snapshot
+from webradio.config    import Configuration
+from webradio.constants import SERVICE_INTERFACE, SERVICE_NAME
+from webradio.index     import ChannelIndex, normalize_uri
 from webradio.model     import Channel, Station, Stream
 from webradio.player    import Player
+from webradio.playlist  import parse as parse_playlist
+from webradio.pool      import WorkerPool
+from webradio.probe     import MirrorSelector
+from webradio.scraper   import create_scraper, open_stream
+from webradio.storage   import get_mtime, replace_file
 from webradio.xdg       import get_cache_filename, get_config_filename
-from StringIO           import StringIO
 
 import gst
 import os.path
 import re
 import sys
+import time
+import uuid
+
+_data_paths = dict()
+
+def find_data_path(basename, test=os.path.isfile):
+    key = basename, test
+
+    if key not in _data_paths:
+        _data_paths[key] = _search_data_path(basename, test)
+
+    return _data_paths[key]
+
+def _search_data_path(basename, test):
+    filename = get_config_filename(basename)
+
+    if test(filename):
+        return filename
+
+    for libdir in sys.path:
+        prefix = os.path.commonprefix([__file__, libdir])
+
+        if not prefix or prefix != libdir:
+            continue
+
+        libdir_parent, libdir_name = os.path.split(libdir)
+
+        if 'site-packages' == libdir_name:
+            prefix = os.path.join(libdir_parent, '..', '..')
+            filename = os.path.join(prefix, 'share', 'webradio', basename)
+
+            if test(filename):
+                return filename
+
+        for filename in [
+                os.path.join(libdir, 'data', basename),
+                os.path.join(libdir_parent, 'data', basename)]:
+            if test(filename):
+                return filename
+
+    return None
+
+def find_config_file(basename):
+    return find_data_path(basename)
+
+def find_station_files():
+    filenames = []
+    filename = find_config_file('stations')
+
+    if filename:
+        filenames.append(filename)
+
+    dirname = find_data_path('stations.d', os.path.isdir)
+
+    if dirname:
+        for basename in sorted(os.listdir(dirname)):
+            if basename.startswith('.') or basename.endswith('~'):
+                continue
+
+            filename = os.path.join(dirname, basename)
+
+            if os.path.isfile(filename):
+                filenames.append(filename)
+
+    return filenames
 
 class Favorites(object):
+    flush_delay = 30
+
     def __init__(self):
-        self.__filename = get_config_filename('favorites')
-        self.__parser = SafeConfigParser()
-        self.__parser.read(self.__filename)
+        self.__filename = get_config_filename('scoreboard')
+        self.__scores = self.__read()
+        self.__top_score = max(self.__scores.values() or [0])
         self.__current_uri = None
-        self.__top_score = 0
         self.__update_id = 0
+        self.__flush_id = 0
+        self.__dirty = False
+
+    def __read(self):
+        scores = dict()
+
+        try:
+            lines = file(self.__filename).readlines()
+
+        except IOError:
+            return scores
+
+        for line in lines:
+            try:
+                score, uri = line.strip().split(' ', 1)
+                scores[uri] = int(score)
+
+            except ValueError:
+                continue
+
+        return scores
 
     def _update_cb(self):
         score = self._get_score(self.__current_uri)
         self._set_score(self.__current_uri, score + 1)
+        return True
+
+    def _flush_cb(self):
+        self.__flush_id = 0
+        self.flush()
+        return False
+
+    def flush(self):
+        if self.__flush_id:
+            source_remove(self.__flush_id)
+            self.__flush_id = 0
+
+        if not self.__dirty:
+            return
 
-        print (self.top_score,
-               self.get_absolute_score(self.__current_uri),
-               self.get_relative_score(self.__current_uri))
+        self.__dirty = False
+        lines = ['%d %s\n' % (score, uri) for uri, score
+                 in self.__scores.iteritems()]
+
+        replace_file(self.__filename, ''.join(lines))
 
     def set_state(self, playing, uri):
         self.__current_uri = uri
@@ -45,42 +158,36 @@ class Favorites(object):
             source_remove(self.__update_id)
             self.__update_id = 0
 
-    def _get_key(self, uri):
-        return 'Scoreboard', uri
-
     def _get_score(self, uri):
-        key = self._get_key(uri)
-
-        if self.__parser.has_option(*key):
-            return self.__parser.getint(*key)
-
-        return 0
+        return self.__scores.get(uri, 0)
 
     def _set_score(self, uri, score):
-        key = self._get_key(uri)
-
-        if not self.__parser.has_section(key[0]):
-            self.__parser.add_section(key[0])
-
-        self.__parser.set(*(key + (str(score), )))
-        self.__parser.write(file(self.__filename, 'w'))
+        self.__scores[uri] = score
         self.__top_score = max(self.__top_score, score)
+        self.__dirty = True
 
-    def get_relative_score(self, uri):
-        print self.__top_score
+        if not self.__flush_id:
+            self.__flush_id = timeout_add_seconds(self.flush_delay,
+                                                  self._flush_cb)
 
+    def get_relative_score(self, uri):
         if self.__top_score > 0:
             return (float(self._get_score(uri)) /
                     float(self.__top_score))
 
         return 0
 
+    def get_top_scores(self, n):
+        return nlargest(n, self.__scores.iteritems(), key=itemgetter(1))
+
     top_score = property(fget=lambda self: self.__top_score)
     get_absolute_score = _get_score
 
 class Service(Object):
-    name = 'de.taschenorakel.webradio'
-    interface = '%s.Service' % name
+    name = SERVICE_NAME
+    interface = SERVICE_INTERFACE
+    find_fields = 'station', 'uri', 'title', 'tags', 'streams'
+    max_changes = 4096
 
     def __init__(self, bus):
         def player_message_cb(bus, message):
@@ -91,12 +198,23 @@ class Service(Object):
             if gst.MESSAGE_ERROR == message.type:
                 print message.structure and message.structure.to_string() or ''
                 self.__player.set_state(gst.STATE_NULL)
+
+                if self.__selector is not None and self.__play_next():
+                    self.__playback_stats['failovers'] += 1
+
                 return True
 
             if gst.MESSAGE_STATE_CHANGED == message.type:
                 if message.src == self.__player:
-                    self.StateChanged(*self.GetState())
-                    self.__favorites.set_state(*self.GetState())
+                    new_state = message.parse_state_changed()[1]
+
+                    if gst.STATE_PLAYING == new_state and self.__play_requested:
+                        self.__record_time_to_audio()
+
+                    playing, stream_uri, station_id, channel_uri = self.GetState()
+
+                    self.StateChanged(playing, stream_uri, station_id, channel_uri)
+                    self.__favorites.set_state(playing, channel_uri or stream_uri)
 
                 return True
 
@@ -107,8 +225,21 @@ class Service(Object):
                         in dict(message.structure).items()
                         if isinstance(v, valid_types)]
 
-                self.StreamTagsChanged(dict(tags))
+                tags = dict(tags)
+                bitrate = tags.get('bitrate') or tags.get('nominal-bitrate')
+
+                if bitrate:
+                    self.__buffering_stats['bitrate'] = bitrate
+
+                self.__pending_tags.update(tags)
+
+                if not self.__tags_timeout:
+                    self.__tags_timeout = timeout_add(250, self.__flush_tags_cb)
+
+                return True
 
+            if gst.MESSAGE_BUFFERING == message.type:
+                self.__buffering_changed(message.parse_buffering())
                 return True
 
             return True
@@ -116,10 +247,45 @@ class Service(Object):
         self.__data_stage = 0
         self.__player = Player()
         self.__player.get_bus().add_watch(player_message_cb)
-        self.__httplib = Http(cache=get_cache_filename())
+        self.__local = local()
+        self.__fetch_stats = dict()
+        self.__fetch_stats_lock = Lock()
+        self.__scraper_stats = dict()
         self.__favorites = Favorites()
         self.__stations = list()
+        self.__index = ChannelIndex()
+        self.__epoch = uuid.uuid4().hex
+        self.__generation_base = 0
+        self.__saved_generation = None
+        self.__changes = list()
+        self.__paged_matches = None, None
         self.__stream_tags = dict()
+        self.__pending_tags = dict()
+        self.__tags_timeout = 0
+        self.__current_channel = None
+        self.__selector = None
+        self.__current_stream = None
+        self.__play_requested = None
+        self.__audio_starts = 0
+        self.__playback_stats = dict(plays=0, failovers=0)
+        self.__playback_stats['time-to-audio'] = 0.0
+        self.__playback_stats['average-time-to-audio'] = 0.0
+
+        self.__buffering_since = None
+        self.__buffering_stats = dict(underruns=0, bitrate=0, level=100)
+        self.__buffering_stats['rebuffer-time'] = 0.0
+
+        config = Configuration()
+        self.__apply_buffering(config.buffer_size, config.buffer_duration)
+        self.__pool = WorkerPool(config.fetch_concurrency,
+                                 config.fetch_host_limit)
+        self.__snapshot_filename = get_cache_filename('catalog')
+        self.__snapshot_max_age = config.catalog_max_age
+        self.__lazy_channels = config.lazy_channels
+        self.__refreshing = False
+
+        if config.refresh_interval > 0:
+            timeout_add_seconds(config.refresh_interval, self.__refresh_cb)
 
         proxy = SessionBus().get_object('org.freedesktop.Notifications', '/org/freedesktop/Notifications')
         self.__notifications = Interface(proxy, 'org.freedesktop.Notifications')
@@ -131,86 +297,276 @@ class Service(Object):
 
         Thread(target=self.__load).start()
 
+    def __get_httplib(self):
+        httplib = getattr(self.__local, 'httplib', None)
+
+        if httplib is None:
+            httplib = Http(cache=get_cache_filename())
+            self.__local.httplib = httplib
+
+        return httplib
+
     def __fetch_from_cache(self, uri):
         print 'fetching from cache %s' % uri
-        return self.__httplib.request(uri, headers={'cache-control': 'only-if-cached'})
+        return self.__get_httplib().request(uri, headers={'cache-control': 'only-if-cached'})
 
     def __fetch_from_web(self, uri):
         print 'fetching from web %s' % uri
-        return self.__httplib.request(uri)
+        return self.__get_httplib().request(uri)
+
+    def __revalidate(self, uri):
+        print 'revalidating %s' % uri
+        return self.__get_httplib().request(uri, headers={'cache-control': 'max-age=0'})
+
+    def __count_fetch(self, key):
+        self.__fetch_stats_lock.acquire()
+
+        try:
+            self.__fetch_stats[key] = self.__fetch_stats.get(key, 0) + 1
 
-    def __fetch(self, uri):
-        response, content = self.__fetch_from_cache(uri)
+        finally:
+            self.__fetch_stats_lock.release()
 
-        if 504 == response.status:
-            response, content = self.__fetch_from_web(uri)
+    def __count_scrape(self, name, succeeded, elapsed):
+        self.__fetch_stats_lock.acquire()
+
+        try:
+            stats = self.__scraper_stats.setdefault(name, [0, 0, 0.0])
+            stats[0] += 1
+            stats[2] += elapsed
+
+            if not succeeded:
+                stats[1] += 1
+
+        finally:
+            self.__fetch_stats_lock.release()
+
+    def __fetch(self, uri, revalidate=False):
+        if revalidate:
+            response, content = self.__revalidate(uri)
+            key = response.fromcache and 'not-modified' or 'downloaded'
+
+        else:
+            response, content = self.__fetch_from_cache(uri)
+            key = 'cached'
+
+            if 504 == response.status:
+                response, content = self.__fetch_from_web(uri)
+                key = 'downloaded'
+
+        if 200 != response.status:
+            key = 'failed'
+
+        self.__count_fetch(key)
 
         return response, content
 
+    def __stream(self, uri):
+        # streamed documents cannot go through the httplib2 cache,
+        # but they still show up in the fetch statistics
+        try:
+            response = open_stream(uri)
+
+        except:
+            self.__count_fetch('failed')
+            raise
+
+        self.__count_fetch('downloaded')
+
+        return response
+
     def __notify(self, summary, body=None, id=0, icon='rhythmbox',
                  app_name='webradio', actions=None, hints=None, timeout=-1):
-        return self.__notifications.Notify(
+        def reply_cb(notify_id):
+            self.__notify_id = notify_id
+
+        def error_cb(error):
+            print 'Cannot show notification: %s' % error
+
+        self.__notifications.Notify(
             app_name or '', int(id), icon or '', summary,
-            body or '', actions or [], hints or {}, int(timeout))
+            body or '', actions or [], hints or {}, int(timeout),
+            reply_handler=reply_cb, error_handler=error_cb)
 
-    def __load(self):
-        def load_station_details(station):
-            response, content = self.__fetch(station.uri)
+    def __flush_tags_cb(self):
+        tags = [(k, v) for k, v in self.__pending_tags.items()
+                if self.__stream_tags.get(k) != v]
 
-            if 200 == response.status:
-                pattern = re.compile(r'href="([^"]+\.pls)"')
+        self.__pending_tags.clear()
+        self.__tags_timeout = 0
 
-                for uri in pattern.findall(content):
-                    if uri.startswith('/'):
-                        uri = urljoin(station.uri, uri)
-                    if station.accept_stream(uri):
-                        pending_channels.append([station, uri])
+        if tags:
+            self.StreamTagsChanged(dict(tags))
 
-                print '%d stations found...' % len(pending_channels)
+        return False
 
-            else:
-                print 'Bad response: %s %s' % (response.reason,
-                                               response.status)
+    def __add_channel(self, station, channel):
+        station.channels.append(channel)
+        self.ChannelAdded(station.id, channel)
 
-        def find_config_file(basename):
-            filename = get_config_filename(basename)
+    def __get_generation(self):
+        return self.__generation_base + len(self.__changes)
 
-            if os.path.isfile(filename):
-                return filename
+    def __record_change(self, change, station, channel):
+        self.__changes.append((change, station, channel))
 
-            for libdir in sys.path:
-                prefix = os.path.commonprefix([__file__, libdir])
+        # drop the oldest half once the log gets long, clients
+        # older than the remaining log get the full catalog
+        if len(self.__changes) > self.max_changes:
+            count = len(self.__changes) // 2
+            del self.__changes[:count]
+            self.__generation_base += count
 
-                if not prefix or prefix != libdir:
-                    continue
+    def __save_snapshot(self):
+        print 'writing catalog snapshot to %r' % self.__snapshot_filename
+        generation = self.__get_generation()
+        state = str(self.__epoch), int(generation)
+        save_snapshot(self.__snapshot_filename, self.__stations, state)
+        self.__saved_generation = generation
 
-                libdir_parent, libdir_name = os.path.split(libdir)
+    def __restore_stations(self, state, stations):
+        for station in stations:
+            self.StationAdded(station)
 
-                if 'site-packages' == libdir_name:
-                    prefix = os.path.join(libdir_parent, '..', '..')
-                    filename = os.path.join(prefix, 'share', 'webradio', basename)
+        # the snapshot is the baseline of the restored change log
+        if state is not None:
+            self.__epoch, self.__generation_base = state
+            del self.__changes[:]
+            self.__saved_generation = self.__generation_base
 
-                    if os.path.isfile(filename):
-                        return filename
+        return False
 
-                for filename in [
-                        os.path.join(libdir, 'data', basename),
-                        os.path.join(libdir_parent, 'data', basename)]:
-                    if os.path.isfile(filename):
-                        return filename
+    @staticmethod
+    def __same_station_config(a, b):
+        return (a.title == b.title and a.uri == b.uri and
+                a.stream_uri == b.stream_uri and
+                a.aliases == b.aliases and
+                a.noise_filters == b.noise_filters)
 
-            return None
+    def __end_refresh(self):
+        self.__refreshing = False
+        return False
 
-        def load_station_list():
-            filename = find_config_file('stations')
+    def __merge_stations(self, stations):
+        try:
+            self.__merge_station_list(stations)
+
+        finally:
+            self.__end_refresh()
+
+        if self.__saved_generation != self.__get_generation():
+            self.__save_snapshot()
+
+    def __merge_station_list(self, stations):
+        current = dict([(s.id, s) for s in self.__stations])
+
+        for station in stations:
+            previous = current.pop(station.id, None)
+
+            if previous is None:
+                self.StationAdded(station)
+                continue
+
+            if not self.__same_station_config(previous, station):
+                self.__remove_station(previous)
+                self.StationAdded(station)
+                continue
+
+            channels = dict([(c.uri, c) for c in previous.channels])
+
+            for channel in station.channels:
+                old_channel = channels.pop(channel.uri, None)
+                streams = channel.streams
+
+                if not streams and old_channel is not None:
+                    streams = old_channel.streams
+
+                channel = Channel(previous, channel.uri, channel.tags, streams)
+
+                if old_channel is None:
+                    self.__add_channel(previous, channel)
+
+                elif (old_channel.tags != channel.tags or
+                      old_channel.streams != channel.streams):
+                    self.__replace_channel(previous, old_channel, channel)
+
+            for channel in channels.values():
+                self.__remove_channel(previous, channel)
+
+        for station in current.values():
+            self.__remove_station(station)
+
+    def __replace_channel(self, station, old_channel, channel):
+        station.channels[station.channels.index(old_channel)] = channel
+        self.__index.remove_channel(old_channel)
+        self.__index.add_channel(channel)
+        self.__record_change('channel-added', station, channel)
+        self.ChannelChanged(station.id, channel)
+
+    def __remove_channel(self, station, channel):
+        station.channels.remove(channel)
+        self.__index.remove_channel(channel)
+        self.__record_change('channel-removed', station, channel)
+        self.ChannelRemoved(station.id, channel.uri)
+
+    def __remove_station(self, station):
+        for channel in list(station.channels):
+            self.__remove_channel(station, channel)
+
+        self.__stations.remove(station)
+        self.__index.remove_station(station)
+        self.__record_change('station-removed', station, None)
+        self.StationRemoved(station.id)
+
+    def __record_station(self, station):
+        self.__record_change('station-added', station, None)
+
+        for channel in station.channels:
+            self.__record_change('channel-added', station, channel)
+
+    def __crawl(self, revalidate=False, emit_signals=True):
+        def station_loaded(station):
+            if emit_signals:
+                idle_add(self.StationAdded, station)
+            else:
+                stations.append(station)
+
+        def channel_loaded(station, channel):
+            if emit_signals:
+                idle_add(self.__add_channel, station, channel)
+            else:
+                station.channels.append(channel)
+
+        def load_station_details(uri, station, scraper):
+            start = time.time()
+            fetch = lambda uri: self.__fetch(uri, revalidate)
+            links = scraper.scrape(uri, fetch, self.__stream)
+            self.__count_scrape(scraper.name, links is not None, time.time() - start)
+
+            channels = []
+
+            if links is not None:
+                for uri in links:
+                    if not station.accept_stream(uri):
+                        continue
+                    if self.__lazy_channels:
+                        channels.append(Channel(station, uri))
+                    else:
+                        pending_channels.append([station, uri])
+
+                print '%d stations found...' % len(pending_channels)
+
+            else:
+                print 'Cannot scrape %s with %s backend' % (uri, scraper.name)
 
-            if filename is None:
-                raise RuntimeError, 'Cannot find station list'
+            for channel in channels:
+                channel_loaded(station, channel)
 
-            print 'reading stations from %r' % filename
+        def load_station_list(filenames):
+            print 'reading stations from %s' % ', '.join(map(repr, filenames))
 
             parser = SafeConfigParser()
-            parser.read(filename)
+            parser.read(filenames)
 
             for station_id in parser.sections():
                 uri = parser.get(station_id, 'uri')
@@ -232,51 +588,267 @@ class Service(Object):
 
                     noise = parser.get(station_id, key)
                     station.add_noise_filter(noise)
+                scraper_options = dict()
+
                 for key in parser.options(station_id):
                     if key.startswith('alias.'):
                         name = key[len('alias.'):]
                         value = parser.get(station_id, key)
                         station.add_alias(name, value)
                         continue
+                    if key.startswith('scraper.'):
+                        name = key[len('scraper.'):]
+                        scraper_options[name] = parser.get(station_id, key, raw=True)
+                        continue
 
-                load_station_details(station)
-                self.StationAdded(station)
+                scraper_name = None
 
-        def load_streams(channel, content):
-            parser = SafeConfigParser()
-            parser.readfp(StringIO(content))
+                if parser.has_option(station_id, 'scraper'):
+                    scraper_name = parser.get(station_id, 'scraper')
+
+                try:
+                    scraper = create_scraper(scraper_name, scraper_options)
+
+                except (ValueError, re.error), e:
+                    print 'Cannot scrape %s: %s' % (station_id, e)
+                    continue
 
-            playlist = dict(parser.items('playlist'))
-            length = int(playlist['numberofentries'])
+                station_loaded(station)
+                self.__pool.submit(scraper.get_uri(station),
+                                   load_station_details, station, scraper)
 
-            for i in range(1, length + 1):
-                uri = playlist['file%d' % i]
-                title = playlist.get('title%d' % i)
-                length = int(playlist.get('length%d' % i, -1))
+            if emit_signals:
+                idle_add(self.DataReady, 1)
 
-                if title:
-                    title = channel.station.filter_noise(title)
+            self.__pool.join()
 
-                stream = Stream(uri, title, length)
+        def load_streams(channel, content):
+            title_filter = channel.station.filter_noise
+
+            for stream in parse_playlist(content, channel.uri, title_filter):
                 channel.streams.append(stream)
 
+        def load_channel(uri, station):
+            response, content = self.__fetch(uri, revalidate)
+            self.__record_redirect(response, uri)
+
+            if 200 == response.status:
+                channel = Channel(station, uri)
+                load_streams(channel, content)
+                channel_loaded(station, channel)
+
         def load_pending_channels():
             for station, uri in pending_channels:
-                response, content = self.__fetch(uri)
+                self.__pool.submit(uri, load_channel, station)
 
-                if 200 == response.status:
-                    channel = Channel(station, uri)
-                    station.channels.append(channel)
-                    load_streams(channel, content)
-                    self.ChannelAdded(station.id, channel)
+            self.__pool.join()
 
-        pending_channels = []
+        filenames = find_station_files()
 
-        load_station_list()
-        idle_add(self.DataReady, 1)
+        if not filenames:
+            raise RuntimeError, 'Cannot find station list'
 
+        pending_channels = []
+        stations = []
+
+        load_station_list(filenames)
         load_pending_channels()
+
+        if emit_signals:
+            idle_add(self.DataReady, 2)
+
+        return stations
+
+    def __is_snapshot_stale(self):
+        snapshot_mtime = get_mtime(self.__snapshot_filename)
+
+        if snapshot_mtime is None:
+            return True
+
+        # the directory mtime covers removed drop-ins and drop-ins
+        # copied with preserved timestamps
+        filenames = find_station_files()
+        dirname = find_data_path('stations.d', os.path.isdir)
+
+        if dirname:
+            filenames.append(dirname)
+
+        for filename in filenames:
+            if snapshot_mtime < get_mtime(filename):
+                return True
+
+        return snapshot_mtime + self.__snapshot_max_age < time.time()
+
+    def __load(self):
+        state, stations = load_snapshot(self.__snapshot_filename)
+
+        if stations is None:
+            self.__crawl()
+            idle_add(self.__save_snapshot)
+            idle_add(self.__prefetch_favorites)
+            return
+
+        print 'read %d stations from catalog snapshot' % len(stations)
+
+        idle_add(self.__restore_stations, state, stations)
+
         idle_add(self.DataReady, 2)
+        idle_add(self.__prefetch_favorites)
+
+        if self.__is_snapshot_stale():
+            self.__refreshing = True
+            self.__refresh()
+
+    def __refresh(self):
+        try:
+            stations = self.__crawl(revalidate=True, emit_signals=False)
+
+        except Exception, e:
+            print 'Cannot refresh catalog: %s' % e
+            idle_add(self.__end_refresh)
+            return
+
+        idle_add(self.__merge_stations, stations)
+
+    def __refresh_cb(self):
+        if self.__data_stage >= 2 and not self.__refreshing:
+            self.__refreshing = True
+            Thread(target=self.__refresh).start()
+
+        return True
+
+    def __resolve_channel(self, channel, callback):
+        def load_streams(uri, channel):
+            streams = None
+
+            try:
+                response, content = self.__fetch(uri)
+                self.__record_redirect(response, uri)
+
+                if 200 == response.status:
+                    title_filter = channel.station.filter_noise
+                    streams = list(parse_playlist(content, uri, title_filter))
+
+            except Exception, e:
+                print 'Cannot resolve %s: %s' % (uri, e)
+
+            finally:
+                idle_add(channel_resolved, channel, streams)
+
+        def channel_resolved(channel, streams):
+            current = self.__index.lookup(channel.uri)
+
+            if current is not None and not current.streams and streams:
+                resolved = Channel(current.station, current.uri,
+                                   current.tags, streams)
+                self.__replace_channel(current.station, current, resolved)
+                current = resolved
+
+            callback(current)
+
+        if channel.streams:
+            callback(channel)
+        else:
+            self.__pool.submit(channel.uri, load_streams, channel)
+
+    def __record_redirect(self, response, uri):
+        location = response.get('content-location')
+
+        if location:
+            location = urljoin(uri, location)
+
+            if location != uri:
+                idle_add(self.__index.add_alias, location, uri)
+
+    def __get_playing_channel(self):
+        channel = self.__current_channel
+
+        if channel is None and self.__player.uri:
+            channel = self.__index.lookup(self.__player.uri)
+
+        return channel
+
+    def __prefetch_favorites(self):
+        for uri, score in self.__favorites.get_top_scores(10):
+            channel = self.__index.lookup(uri)
+
+            if channel is not None and not channel.streams:
+                self.__resolve_channel(channel, lambda channel: None)
+
+    def __play_channel(self, channel):
+        if channel is None or not channel.streams:
+            return
+
+        self.__current_channel = channel
+        self.__start_playback([s.uri for s in channel.streams])
+
+    def __start_playback(self, uris):
+        if self.__selector is not None:
+            self.__selector.cancel()
+
+        self.__selector = MirrorSelector(uris, self.__mirror_probed)
+        self.__current_stream = None
+        self.__play_requested = time.time()
+        self.__playback_stats['plays'] += 1
+        self.__play_next()
+
+    def __mirror_probed(self, selector):
+        if selector is self.__selector and self.__current_stream is None:
+            self.__play_next()
+
+    def __play_next(self):
+        uri = self.__selector.next()
+        self.__current_stream = uri
+
+        if uri is None:
+            return False
+
+        print 'playing %s' % uri
+        self.__play_uri(uri)
+
+        return True
+
+    def __record_time_to_audio(self):
+        elapsed = time.time() - self.__play_requested
+        stats = self.__playback_stats
+        average = stats['average-time-to-audio']
+
+        self.__audio_starts += 1
+        stats['time-to-audio'] = elapsed
+        stats['average-time-to-audio'] = (
+            average + (elapsed - average) / self.__audio_starts)
+
+        self.__play_requested = None
+
+    def __apply_buffering(self, size, duration):
+        if duration >= 0:
+            duration *= gst.MSECOND
+
+        self.__player.buffer_size = size
+        self.__player.buffer_duration = duration
+
+    def __buffering_changed(self, percent):
+        self.__buffering_stats['level'] = percent
+
+        if percent < 100 and self.__buffering_since is None:
+            result, state, pending = self.__player.get_state(0)
+
+            if gst.STATE_PLAYING in (state, pending):
+                if gst.STATE_PLAYING == state:
+                    self.__buffering_stats['underruns'] += 1
+
+                self.__buffering_since = time.time()
+                self.__player.set_state(gst.STATE_PAUSED)
+
+        elif percent >= 100 and self.__buffering_since is not None:
+            elapsed = time.time() - self.__buffering_since
+            self.__buffering_stats['rebuffer-time'] += elapsed
+            self.__buffering_since = None
+            self.__player.set_state(gst.STATE_PLAYING)
+
+    def __play_uri(self, uri):
+        self.__buffering_since = None
+        self.__player.switch_uri(uri)
 
     def run(self):
         try:
@@ -285,11 +857,66 @@ class Service(Object):
         except KeyboardInterrupt:
             self.__loop.quit()
 
+        self.__favorites.flush()
+
+        if (self.__data_stage >= 2 and
+            self.__saved_generation != self.__get_generation()):
+            self.__save_snapshot()
+
     @method(dbus_interface=interface, utf8_strings=True,
             in_signature='', out_signature='a' + Station.dbus_signature)
     def GetStations(self):
         return self.__stations
 
+    @method(dbus_interface=interface, in_signature='', out_signature='si')
+    def GetGeneration(self):
+        return self.__epoch, self.__get_generation()
+
+    @method(dbus_interface=interface, utf8_strings=True, in_signature='si',
+            out_signature='sib' + 'a' + Station.dbus_signature +
+                          'a(s' + Channel.dbus_signature + ')asa(ss)')
+    def GetChangesSince(self, epoch, generation):
+        incremental = (epoch == self.__epoch and
+                       self.__generation_base <= generation <=
+                       self.__get_generation())
+
+        if not incremental:
+            added_stations = [(s.id, s.title, s.uri, []) for s in self.__stations]
+            added_channels = [(s.id, c) for s in self.__stations
+                              for c in s.channels]
+
+            return (self.__epoch, self.__get_generation(), False,
+                    added_stations, added_channels, [], [])
+
+        stations = dict()
+        channels = dict()
+        removed_stations = set()
+        start = generation - self.__generation_base
+
+        for change, station, channel in self.__changes[start:]:
+            if 'station-added' == change:
+                stations[station.id] = station
+            elif 'station-removed' == change:
+                # a station replaced with new settings is reported
+                # as removed and added, so clients drop the old one
+                stations[station.id] = None
+                removed_stations.add(station.id)
+            elif 'channel-added' == change:
+                channels[channel.uri] = station, channel
+            elif 'channel-removed' == change:
+                channels[channel.uri] = station, None
+
+        added_stations = [(s.id, s.title, s.uri, []) for s
+                          in stations.values() if s is not None]
+        added_channels = [(s.id, c) for s, c
+                          in channels.values() if c is not None]
+        removed_channels = [(s.id, uri) for uri, (s, c)
+                            in channels.items() if c is None]
+
+        return (self.__epoch, self.__get_generation(), True,
+                added_stations, added_channels,
+                list(removed_stations), removed_channels)
+
     @method(dbus_interface=interface, utf8_strings=True,
             in_signature='', out_signature='a{sv}')
     def GetStreamTags(self):
@@ -298,24 +925,112 @@ class Service(Object):
     @method(dbus_interface=interface, utf8_strings=True, in_signature='as',
             out_signature='a(s' + Channel.dbus_signature + ')')
     def Find(self, query):
-        result = list()
+        return [(c.station.id, c) for c in self.__index.find(query)]
+
+    @staticmethod
+    def __project(channel, fields):
+        match = dict()
+
+        for name in fields or Service.find_fields:
+            if 'station' == name:
+                match[name] = channel.station.id
+            elif 'station_title' == name:
+                match[name] = channel.station.title or ''
+            elif 'uri' == name:
+                match[name] = channel.uri
+            elif 'title' == name:
+                match[name] = channel.title or ''
+            elif 'tags' == name:
+                match[name] = Array(channel.tags, signature='s')
+            elif 'streams' == name:
+                match[name] = Array(channel.streams,
+                                    signature=Stream.dbus_signature)
+
+        return match
 
-        for station in self.__stations:
-            for channel in station.channels:
-                if channel.matches(query):
-                    match = station.id, channel
-                    result.append(match)
+    @method(dbus_interface=interface, utf8_strings=True,
+            in_signature='asiias', out_signature='iaa{sv}')
+    def FindPaged(self, query, offset, limit, fields):
+        key = tuple(query), self.__epoch, self.__get_generation()
+
+        if self.__paged_matches[0] != key:
+            matches = self.__index.find(query)
+            matches.sort(key=lambda c: (c.station.id, c.title or '', c.uri))
+            self.__paged_matches = key, matches
+
+        matches = self.__paged_matches[1]
+        offset = max(0, offset)
+
+        if limit >= 0:
+            page = matches[offset:offset + limit]
+        else:
+            page = matches[offset:]
+
+        return len(matches), [self.__project(c, fields) for c in page]
+
+    @method(dbus_interface=interface, utf8_strings=True, in_signature='s',
+            out_signature=Channel.dbus_signature,
+            async_callbacks=('reply_cb', 'error_cb'))
+    def ResolveChannel(self, uri, reply_cb, error_cb):
+        def channel_resolved_cb(channel):
+            if channel is not None and channel.streams:
+                reply_cb(channel)
+            else:
+                error_cb(LookupError('Cannot resolve channel %s' % uri))
 
-        return result
+        channel = self.__index.lookup(uri)
+
+        if channel is None:
+            error_cb(LookupError('Unknown channel %s' % uri))
+            return
+
+        self.__resolve_channel(channel, channel_resolved_cb)
 
     @method(dbus_interface=interface, in_signature='s', out_signature='')
     def Play(self, uri):
-        self.__player.set_state(gst.STATE_NULL)
-        self.__player.uri = uri
-        self.__player.set_state(gst.STATE_PLAYING)
+        channel = self.__index.lookup(uri)
+
+        if channel is None:
+            self.__current_channel = None
+            self.__start_playback([uri])
+            return
+
+        if normalize_uri(uri) in [normalize_uri(s.uri) for s in channel.streams]:
+            self.__current_channel = channel
+            self.__start_playback([uri])
+            return
+
+        self.__resolve_channel(channel, self.__play_channel)
+
+    @method(dbus_interface=interface, in_signature='', out_signature='a{sv}')
+    def GetPlaybackStatistics(self):
+        stats = dict(self.__playback_stats)
+        timings = self.__selector and self.__selector.timings or {}
+        stats['probe-timings'] = Dictionary(timings, signature='sd')
+
+        return stats
+
+    @method(dbus_interface=interface, in_signature='', out_signature='a{sv}')
+    def GetBufferingStatistics(self):
+        return self.__buffering_stats
+
+    @method(dbus_interface=interface, in_signature='', out_signature='ii')
+    def GetBuffering(self):
+        config = Configuration()
+        return config.buffer_size, config.buffer_duration
+
+    @method(dbus_interface=interface, in_signature='ii', out_signature='')
+    def SetBuffering(self, size, duration):
+        config = Configuration()
+        config.buffer_size = size
+        config.buffer_duration = duration
+        config.write()
+
+        self.__apply_buffering(size, duration)
 
     @method(dbus_interface=interface, in_signature='', out_signature='')
     def Pause(self):
+        self.__buffering_since = None
         self.__player.set_state(gst.STATE_PAUSED)
 
     @method(dbus_interface=interface, in_signature='', out_signature='')
@@ -326,15 +1041,56 @@ class Service(Object):
     def Quit(self):
         self.__loop.quit()
 
+    @method(dbus_interface=interface, in_signature='', out_signature='a{si}')
+    def GetFetchStatistics(self):
+        self.__fetch_stats_lock.acquire()
+
+        try:
+            return dict(self.__fetch_stats)
+
+        finally:
+            self.__fetch_stats_lock.release()
+
+    @method(dbus_interface=interface, in_signature='', out_signature='a{s(iid)}')
+    def GetScraperStatistics(self):
+        self.__fetch_stats_lock.acquire()
+
+        try:
+            return dict([(name, tuple(stats)) for name, stats
+                         in self.__scraper_stats.items()])
+
+        finally:
+            self.__fetch_stats_lock.release()
+
+    @method(dbus_interface=interface, in_signature='i', out_signature='a(si)')
+    def GetTopChannels(self, n):
+        return self.__favorites.get_top_scores(n)
+
     @method(dbus_interface=interface, in_signature='', out_signature='i')
     def GetDataStage(self):
         return self.__data_stage
 
-    @method(dbus_interface=interface, in_signature='', out_signature='bs')
+    @method(dbus_interface=interface, utf8_strings=True,
+            in_signature='as', out_signature='a{sv}')
+    def GetCurrentChannel(self, fields):
+        channel = self.__get_playing_channel()
+
+        if channel is None:
+            return Dictionary(signature='sv')
+
+        return self.__project(channel, fields)
+
+    @method(dbus_interface=interface, in_signature='', out_signature='bsss')
     def GetState(self):
-        playing = (gst.STATE_PLAYING == self.__player.get_state()[1])
-        channel_uri = self.__player.uri or ''
-        return playing, channel_uri
+        playing = (self.__buffering_since is not None or
+                   gst.STATE_PLAYING == self.__player.get_state()[1])
+        stream_uri = self.__player.uri or ''
+        channel = self.__get_playing_channel()
+
+        if channel is None:
+            return playing, stream_uri, '', ''
+
+        return playing, stream_uri, channel.station.id, channel.uri
 
     @signal(dbus_interface=interface, signature='i')
     def DataReady(self, stage):
@@ -343,38 +1099,42 @@ class Service(Object):
     @signal(dbus_interface=interface, signature=Station.dbus_signature)
     def StationAdded(self, station):
         self.__stations.append(station)
+        self.__index.add_station(station)
+        self.__record_station(station)
 
     @signal(dbus_interface=interface, signature='s' + Channel.dbus_signature)
     def ChannelAdded(self, station_id, channel):
+        self.__index.add_channel(channel)
+        self.__record_change('channel-added', channel.station, channel)
+
+    @signal(dbus_interface=interface, signature='s' + Channel.dbus_signature)
+    def ChannelChanged(self, station_id, channel):
         pass
 
-    @signal(dbus_interface=interface, signature='bs')
-    def StateChanged(self, playing, stream_uri):
+    @signal(dbus_interface=interface, signature='ss')
+    def ChannelRemoved(self, station_id, channel_uri):
+        pass
+
+    @signal(dbus_interface=interface, signature='s')
+    def StationRemoved(self, station_id):
+        pass
+
+    @signal(dbus_interface=interface, signature='bsss')
+    def StateChanged(self, playing, stream_uri, station_id, channel_uri):
         pass
 
     @signal(dbus_interface=interface, signature='a{sv}')
     def StreamTagsChanged(self, tags):
         self.__stream_tags.update(tags)
 
-        summary = self.__stream_tags.get('title') or ''
-        body = self.__stream_tags.get('organization') or ''
-        self.__notify_id = self.__notify(summary, body, id=self.__notify_id)
+        if 'title' in tags:
+            summary = self.__stream_tags.get('title') or ''
+            body = self.__stream_tags.get('organization') or ''
+            self.__notify(summary, body, id=self.__notify_id)
 
     @method(dbus_interface=interface, in_signature='', out_signature='as')
     def GetTags(self):
-        tags = dict()
-
-        for s in self.__stations:
-            for c in s.channels:
-                for t in c.tags:
-                    tags[t] = True
-
-            tags[s.id] = True
-
-        tags = list(tags)
-        tags.sort()
-
-        return tags
+        return self.__index.tags
 
     @method(dbus_interface=interface, in_signature='', out_signature='as')
     def ListEqualizerProfiles(self):
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+def replace_file(filename, data):
+    dirname, basename = os.path.split(filename)
+
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    fd, tmpname = tempfile.mkstemp(prefix='.%s.' % basename, dir=dirname)
+
+    try:
+        target = os.fdopen(fd, 'wb')
+        target.write(data)
+        target.close()
+
+        os.rename(tmpname, filename)
+
+    except:
+        os.unlink(tmpname)
+        raise
+
+def get_mtime(filename):
+    try:
+        return os.stat(filename).st_mtime
+
+    except OSError:
+        return None
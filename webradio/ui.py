@@ -1,3 +1,4 @@
+from bisect             import bisect_left
 from dbus.mainloop.glib import DBusGMainLoop
 from webradio.client    import Client
 from webradio.config    import Configuration
@@ -8,6 +9,7 @@ import cairo
 import glib
 import gtk
 import pango
+import pangocairo
 
 class MarqueLabel(gtk.Widget):
     __gtype_name__ = 'WebRadioMarqueLabel'
@@ -19,21 +21,111 @@ class MarqueLabel(gtk.Widget):
         self.__layout.set_ellipsize(pango.ELLIPSIZE_END)
         self.__xpad, self.__ypad = 9, 3
         self.__gradient = None
+        self.__surface = None
         self.__offset = 0
 
+        self.__timeout_id = 0
+        self.__toplevel = None
+        self.__toplevel_handlers = []
+        self.__obscured = False
+        self.__iconified = False
+
         self.set_flags(gtk.NO_WINDOW)
 
-        def timeout_cb():
+    def __get_text_surface(self):
+        if self.__surface is None:
             w, h = self.__layout.get_pixel_size()
-            self.__offset += 1
 
-            if self.__offset > w:
-                self.__offset -= w
+            self.__surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, max(w, 1), max(h, 1))
+            cr = pangocairo.CairoContext(cairo.Context(self.__surface))
 
-            self.queue_draw()
-            return True
+            fg = self.style.fg[self.state]
+            fg = fg.red, fg.green, fg.blue
+            cr.set_source_rgb(*[c/65535.0 for c in fg])
+            cr.show_layout(self.__layout)
+
+        return self.__surface
+
+    def __get_gradient(self):
+        if self.__gradient is None:
+            w = self.allocation.width
+            p = self.__xpad / float(w)
+            q = 1 - p
+
+            self.__gradient = cairo.LinearGradient(0, 0, w, 0)
+            self.__gradient.add_color_stop_rgba(0, 0, 0, 0, 0)
+            self.__gradient.add_color_stop_rgba(p, 0, 0, 0, 1)
+            self.__gradient.add_color_stop_rgba(q, 0, 0, 0, 1)
+            self.__gradient.add_color_stop_rgba(1, 0, 0, 0, 0)
+
+        return self.__gradient
+
+    def __is_overflowing(self):
+        w, h = self.__layout.get_pixel_size()
+        return w > self.allocation.width - 2 * self.__xpad
+
+    def __update_animation(self):
+        animate = (self.flags() & gtk.MAPPED and
+                   not self.__obscured and not self.__iconified and
+                   self.__is_overflowing())
+
+        if animate and not self.__timeout_id:
+            self.__timeout_id = glib.timeout_add(60, self.__timeout_cb)
+
+        elif not animate and self.__timeout_id:
+            glib.source_remove(self.__timeout_id)
+            self.__timeout_id = 0
+
+            if self.__offset and not self.__is_overflowing():
+                self.__offset = 0
+                self.queue_draw()
+
+    def __timeout_cb(self):
+        w, h = self.__layout.get_pixel_size()
+        self.__offset += 1
+
+        if self.__offset > w:
+            self.__offset -= w
+
+        self.queue_draw_area(self.allocation.x, self.allocation.y + self.__ypad,
+                             self.allocation.width, h)
+
+        return True
+
+    def __visibility_notify_cb(self, window, event):
+        self.__obscured = (gtk.gdk.VISIBILITY_FULLY_OBSCURED == event.state)
+        self.__update_animation()
+        return False
+
+    def __window_state_cb(self, window, event):
+        self.__iconified = bool(event.new_window_state & gtk.gdk.WINDOW_STATE_ICONIFIED)
+        self.__update_animation()
+        return False
+
+    def do_hierarchy_changed(self, previous_toplevel):
+        for handler_id in self.__toplevel_handlers:
+            self.__toplevel.disconnect(handler_id)
+
+        self.__toplevel_handlers = []
+        self.__toplevel = self.get_toplevel()
+
+        if isinstance(self.__toplevel, gtk.Window):
+            self.__toplevel.add_events(gtk.gdk.VISIBILITY_NOTIFY_MASK)
+            self.__toplevel_handlers = [
+                self.__toplevel.connect('visibility-notify-event', self.__visibility_notify_cb),
+                self.__toplevel.connect('window-state-event', self.__window_state_cb),
+            ]
+
+        self.__obscured = self.__iconified = False
+        self.__update_animation()
+
+    def do_map(self):
+        gtk.Widget.do_map(self)
+        self.__update_animation()
 
-        glib.timeout_add(60, timeout_cb)
+    def do_unmap(self):
+        gtk.Widget.do_unmap(self)
+        self.__update_animation()
 
     def do_expose_event(self, event):
         self.style.paint_flat_box(
@@ -45,43 +137,36 @@ class MarqueLabel(gtk.Widget):
         cr.rectangle(event.area)
         cr.clip()
 
-        fg = self.style.fg[self.state]
-        fg = fg.red, fg.green, fg.blue
-        r, g, b = [c/65565.0 for c in fg]
+        surface = self.__get_text_surface()
+        w = surface.get_width()
 
-        if self.__gradient is None:
-            w = self.allocation.width
-            p = self.__xpad / float(w)
-            q = 1 - p
-
-            self.__gradient = cairo.LinearGradient(0, 0, w, 0)
-            self.__gradient.add_color_stop_rgba(0, r, g, b, 0)
-            self.__gradient.add_color_stop_rgba(p, r, g, b, 1)
-            self.__gradient.add_color_stop_rgba(q, r, g, b, 1)
-            self.__gradient.add_color_stop_rgba(1, r, g, b, 0)
-
-        w, h = self.__layout.get_pixel_size()
-
-        cr.set_source(self.__gradient)
         cr.translate(self.allocation.x, self.allocation.y)
+        cr.push_group()
 
-        cr.move_to(0 - self.__offset, self.__ypad)
-        cr.layout_path(self.__layout)
+        cr.set_source_surface(surface, 0 - self.__offset, self.__ypad)
+        cr.paint()
 
-        cr.move_to(0 - self.__offset + w, self.__ypad)
-        cr.layout_path(self.__layout)
+        if self.__offset:
+            cr.set_source_surface(surface, 0 - self.__offset + w, self.__ypad)
+            cr.paint()
 
-        cr.fill()
+        cr.pop_group_to_source()
+        cr.mask(self.__get_gradient())
 
         return False
 
     def do_style_set(self, old_style):
         gtk.Widget.do_style_set(self, old_style)
         self.__gradient = None
+        self.__surface = None
+
+    def do_state_changed(self, previous_state):
+        self.__surface = None
 
     def do_size_allocate(self, alloc):
         gtk.Widget.do_size_allocate(self, alloc)
         self.__gradient = None
+        self.__update_animation()
 
     def do_size_request(self, req):
         w, h = self.__layout.get_pixel_size()
@@ -90,32 +175,103 @@ class MarqueLabel(gtk.Widget):
 
     def set_markup(self, markup):
         self.__layout.set_markup(' %s ' % markup)
+        self.__surface = None
         self.__offset = 0
         self.queue_resize()
+        self.__update_animation()
 
 
 class TagsCompletion(gtk.EntryCompletion):
     __gtype_name__ = 'WebRadioTagsTagsCompletion'
 
-    def __init__(self, tags):
+    def __init__(self, tags=(), limit=50):
         super(TagsCompletion, self).__init__()
 
-        self.__tags = set(tags)
-        model = gtk.ListStore(str)
-
-        for t in tags:
-            model.insert(-1, (t, ))
+        self.__counts = dict()
+        self.__tags = []
+        self.__limit = limit
+        self.__text = None
 
-        self.set_model(model)
+        self.set_model(gtk.ListStore(str))
         self.set_text_column(0)
-        self.set_match_func(self.__match_cb)
+        self.set_match_func(lambda completion, key, iter: True)
+        self.add(tags)
+
+    def attach(self, entry):
+        entry.connect('changed', self.__entry_changed_cb)
+        entry.set_completion(self)
 
     def add(self, tags):
+        new_tags = set()
+
+        for t in tags:
+            count = self.__counts.get(t)
+
+            if count is None:
+                new_tags.add(t)
+                count = 0
+
+            self.__counts[t] = count + 1
+
+        if new_tags:
+            self.__tags.extend(new_tags)
+            self.__tags.sort()
+            self.__text = None
+
+    def remove(self, tags):
+        removed = False
+
+        for t in tags:
+            count = self.__counts.get(t)
+
+            if count is None:
+                continue
+
+            if count > 1:
+                self.__counts[t] = count - 1
+                continue
+
+            del self.__counts[t]
+            del self.__tags[bisect_left(self.__tags, t)]
+            removed = True
+
+        if removed:
+            self.__text = None
+
+    def find(self, text):
+        current_tags = text.split(' ')
+        key = current_tags[-1]
+
+        if not key:
+            return []
+
+        tags = self.__tags
+        matches = []
+        i = bisect_left(tags, key)
+
+        while i < len(tags) and tags[i].startswith(key):
+            if tags[i] not in current_tags:
+                matches.append(tags[i])
+
+            i += 1
+
+        counts = self.__counts
+        matches.sort(key=lambda t: -counts[t])
+
+        return matches[:self.__limit]
+
+    def __entry_changed_cb(self, entry):
+        text = entry.get_text()
+
+        if text == self.__text:
+            return
+
+        self.__text = text
         model = self.get_model()
+        model.clear()
 
-        for t in set(tags).difference(self.__tags):
-            model.insert(-1, (t, ))
-            self.__tags.add(t)
+        for t in self.find(text):
+            model.append((t, ))
 
     def do_match_selected(self, model, iter):
         tag, = model.get(iter, 0)
@@ -133,44 +289,78 @@ class TagsCompletion(gtk.EntryCompletion):
 
         return True
 
-    @staticmethod
-    def __match_cb(completion, key, iter):
-        tag, = completion.get_model().get(iter, 0)
-
-        #key = key[:completion.get_entry().get_position()]
-        current_tags = key.rsplit(' ')
-        key = current_tags[-1]
-
-        if not key:
-            return False
-        if tag in current_tags:
-            return False
-
-        return tag.startswith(key)
-
 class MainWindow(gtk.Window):
     __gtype_name__ = 'WebRadioMainWindow'
 
+    bulk_insert_threshold = 256
+
     def __init__(self, client=None):
         super(MainWindow, self).__init__()
 
         if client is None:
             client = Client()
 
+        self.__rows = dict()
+        self.__search_keys = dict()
+        self.__tag_bits = dict()
+        self.__visible_channels = set()
+        self.__pending_channels = []
+        self.__pending_timeout = 0
+        self.__loading = True
+        self.__current_tags = []
+
         def channel_compare_cb(model, a, b):
             a, = model.get(a, 0)
             b, = model.get(b, 0)
 
-            return (
-                cmp(a.title,         b.title) or
-                cmp(a.tags,          b.tags) or
-                cmp(a.station.title, b.station.title))
+            return cmp(self.__search_keys[a][2], self.__search_keys[b][2])
 
-        channels = gtk.ListStore(object)
+        channels = gtk.ListStore(object, bool)
         channels.set_sort_func(0, channel_compare_cb)
         channels.set_sort_column_id(0, gtk.SORT_ASCENDING)
 
-        tag_completion = TagsCompletion(client.get_tags())
+        def get_tag_bit(tag):
+            bit = self.__tag_bits.get(tag)
+
+            if bit is None:
+                bit = self.__tag_bits[tag] = 1 << len(self.__tag_bits)
+
+            return bit
+
+        def make_search_key(channel):
+            mask = get_tag_bit(channel.station.id)
+
+            for tag in channel.tags:
+                mask |= get_tag_bit(tag)
+
+            text = '\0'.join((channel.station.title, channel.title))
+            order = channel.title, channel.tags, channel.station.title
+
+            return mask, text, order
+
+        def compile_query(terms):
+            return [(self.__tag_bits.get(q, 0), q) for q in terms]
+
+        def key_matches(key, query):
+            mask, text, order = key
+
+            for bit, q in query:
+                if not (mask & bit or q in text):
+                    return False
+
+            return True
+
+        # completion counts are kept per channel, so tags
+        # disappear again once their last channel is removed
+        tag_completion = TagsCompletion([])
+
+        def get_completion_tags(channel):
+            station_id = channel.station and channel.station.id
+
+            if station_id and station_id not in channel.tags:
+                return channel.tags + (station_id,)
+
+            return channel.tags
         self.__current_title = None
 
         def read_wishlist():
@@ -188,17 +378,72 @@ class MainWindow(gtk.Window):
 
         self.__wishlist = read_wishlist()
 
+        def select_channel(channel):
+            if (channel == self.__client.current_channel or
+               (channel.uri == self.__config.channel_uri and
+                self.__client.current_channel is None)):
+
+                if channel in self.__visible_channels:
+                    model = tree_view.get_model()
+                    tree_iter = model.convert_child_iter_to_iter(self.__rows[channel])
+                    tree_view.get_selection().select_iter(tree_iter)
+
+        def flush_channels_cb():
+            pending, self.__pending_channels = self.__pending_channels, []
+            self.__pending_timeout = 0
+
+            query = compile_query(self.__current_tags)
+            tags = []
+
+            # for bulk loads keep the store unsorted while appending, then
+            # sort once; small batches are cheaper to insert sorted
+            bulk = self.__loading or len(pending) > self.bulk_insert_threshold
+
+            if bulk:
+                channels.set_sort_column_id(-2, gtk.SORT_ASCENDING)
+
+            for channel in pending:
+                if channel in self.__rows:
+                    continue
+
+                key = self.__search_keys[channel] = make_search_key(channel)
+                visible = key_matches(key, query)
+
+                if visible:
+                    self.__visible_channels.add(channel)
+
+                self.__rows[channel] = channels.append((channel, visible))
+                tags.extend(get_completion_tags(channel))
+
+            if bulk:
+                channels.set_sort_column_id(0, gtk.SORT_ASCENDING)
+
+            tag_completion.add(tags)
+
+            for channel in pending:
+                select_channel(channel)
+
+            return False
+
         def channel_added_cb(client, channel):
-            tree_iter = channels.insert(-1, (channel, ))
-            tag_completion.add(channel.tags)
+            self.__pending_channels.append(channel)
 
-            if (channel == client.current_channel or
-               (channel.uri == self.__config.channel_uri and
-                client.current_channel is None)):
+            if not (self.__loading or self.__pending_timeout):
+                self.__pending_timeout = glib.idle_add(flush_channels_cb)
 
-                model = tree_view.get_model()
-                tree_iter = model.convert_child_iter_to_iter(tree_iter)
-                tree_view.get_selection().select_iter(tree_iter)
+        def channel_removed_cb(client, channel):
+            tree_iter = self.__rows.pop(channel, None)
+
+            if tree_iter is None:
+                if channel in self.__pending_channels:
+                    self.__pending_channels.remove(channel)
+
+                return
+
+            channels.remove(tree_iter)
+            tag_completion.remove(get_completion_tags(channel))
+            self.__search_keys.pop(channel, None)
+            self.__visible_channels.discard(channel)
 
         def state_changed_cb(client):
             if client.is_playing:
@@ -213,8 +458,8 @@ class MainWindow(gtk.Window):
             tree_view.queue_draw()
 
         def stream_tags_changed_cb(client):
-            self.__current_title = client.stream_tags.get('title').strip() or None
-            org = client.stream_tags.get('organization').strip() or None
+            self.__current_title = (client.stream_tags.get('title') or '').strip() or None
+            org = (client.stream_tags.get('organization') or '').strip() or None
             markup = []
 
             if self.__current_title:
@@ -236,20 +481,16 @@ class MainWindow(gtk.Window):
 
         self.__client = client
         self.__client.connect('channel-added',       channel_added_cb)
+        self.__client.connect('channel-removed',     channel_removed_cb)
         self.__client.connect('state-changed',       state_changed_cb)
         self.__client.connect('stream-tags-changed', stream_tags_changed_cb)
         self.__client.wait(Client.STATE_STATIONS_LOADED)
 
         self.__filter_timeout = 0
-        self.__current_tags = []
         self.__config = Configuration()
 
-        def channel_visible_cb(model, iter):
-            channel, = model.get(iter, 0)
-            return channel.matches(self.__current_tags)
-
         matching_channels = gtk.TreeModel.filter_new(channels)
-        matching_channels.set_visible_func(channel_visible_cb)
+        matching_channels.set_visible_column(1)
 
         self.set_title('WebRadio')
         self.set_default_size(500, 400)
@@ -265,7 +506,7 @@ class MainWindow(gtk.Window):
 
         def play_button_clicked_cb(button):
             if not button.get_active():
-                self.__client.pause()
+                self.__client.pause_async()
                 return
 
             model, tree_iter = tree_view.get_selection().get_selected()
@@ -276,10 +517,10 @@ class MainWindow(gtk.Window):
 
             if channel is not None:
                 if channel == self.__client.current_channel:
-                    self.__client.resume()
+                    self.__client.resume_async()
 
                 else:
-                    self.__client.play(channel)
+                    self.__client.play_async(channel)
 
         def favorite_button_clicked_cb(button):
             if not self.__current_title:
@@ -316,8 +557,26 @@ class MainWindow(gtk.Window):
         toolbar.insert(item, -1)
 
         def filter_timeout_cb(entry):
-            self.__current_tags = filter(None, entry.get_text().split(' '))
-            matching_channels.refilter()
+            terms = filter(None, entry.get_text().split(' '))
+            query = compile_query(terms)
+
+            if set(self.__current_tags).issubset(terms):
+                candidates = list(self.__visible_channels)
+            else:
+                candidates = self.__rows.keys()
+
+            self.__current_tags = terms
+
+            for channel in candidates:
+                visible = key_matches(self.__search_keys[channel], query)
+
+                if visible != (channel in self.__visible_channels):
+                    if visible:
+                        self.__visible_channels.add(channel)
+                    else:
+                        self.__visible_channels.discard(channel)
+
+                    channels.set_value(self.__rows[channel], 1, visible)
 
             self.__filter_timeout = 0
             return False
@@ -330,7 +589,7 @@ class MainWindow(gtk.Window):
 
         self.__filter_entry = gtk.Entry()
         self.__filter_entry.set_width_chars(40)
-        self.__filter_entry.set_completion(tag_completion)
+        tag_completion.attach(self.__filter_entry)
         self.__filter_entry.connect('changed', filter_entry_changed_cb)
         item.add(self.__filter_entry)
 
@@ -342,7 +601,7 @@ class MainWindow(gtk.Window):
         def row_activated_cb(view, path, column):
             model = view.get_model()
             channel, = model.get(model.get_iter(path), 0)
-            self.__client.play(channel)
+            self.__client.play_async(channel)
 
         tree_view = gtk.TreeView(matching_channels)
         tree_view.set_headers_visible(False)
@@ -408,9 +667,13 @@ class MainWindow(gtk.Window):
         self.__filter_entry.set_text(tags + ' ')
         self.__filter_entry.set_position(-1)
 
+        self.__pending_channels = []
+
         for station in self.__client.get_stations():
-            for channel in station.channels:
-                channel_added_cb(self.__client, channel)
+            self.__pending_channels.extend(station.channels)
+
+        flush_channels_cb()
+        self.__loading = False
 
         self.get_child().show_all()
 